@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+"""
+Benchmark suite for the neutron converter kernels and HTTP endpoints.
+
+Measures the scalar NeutronConverter methods, the vectorized kernels,
+endpoint throughput through the Flask test client and a real local server,
+and startup: fresh interpreters importing the kernels, creating the app or
+running the command line, and the in-process cost of create_app().
+Results can be saved as a JSON baseline and compared against on later runs;
+the run fails when any benchmark's ops/sec drops by more than the threshold.
+
+    python bench.py --save bench_baseline.json
+    python bench.py --compare bench_baseline.json --threshold 0.15
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import timeit
+
+import numpy as np
+from werkzeug.serving import make_server
+
+from neutron import NeutronConverter, TofConverter
+from rebin import rebin_histogram
+from web import MicroBatcher, _full_conversion_kernel, create_app
+
+app = create_app()
+
+# Registered benchmarks: name -> (setup function, elements processed per call)
+BENCHMARKS = {}
+
+# Elements per call in the vectorized benchmarks
+ARRAY_SIZE = 1_000_000
+BATCH_SIZE = 1000
+
+
+def benchmark(name, elements=1):
+    """Register a benchmark whose setup function returns the callable to time."""
+    def register(setup):
+        BENCHMARKS[name] = (setup, elements)
+        return setup
+    return register
+
+
+@benchmark('scalar.energy_to_velocity')
+def _():
+    return lambda: NeutronConverter.energy_to_velocity(25.0)
+
+
+@benchmark('scalar.velocity_to_energy')
+def _():
+    return lambda: NeutronConverter.velocity_to_energy(2187.9)
+
+
+@benchmark('scalar.velocity_to_wavelength')
+def _():
+    return lambda: NeutronConverter.velocity_to_wavelength(2187.9)
+
+
+@benchmark('scalar.wavelength_to_velocity')
+def _():
+    return lambda: NeutronConverter.wavelength_to_velocity(1.8)
+
+
+@benchmark('scalar.energy_to_wavelength')
+def _():
+    return lambda: NeutronConverter.energy_to_wavelength(25.0)
+
+
+@benchmark('scalar.wavelength_to_energy')
+def _():
+    return lambda: NeutronConverter.wavelength_to_energy(1.8)
+
+
+@benchmark('scalar.convert_all')
+def _():
+    return lambda: NeutronConverter.convert_all('energy', 25.0)
+
+
+@benchmark('array.energy_to_velocity', elements=ARRAY_SIZE)
+def _():
+    energies = np.linspace(0.1, 1000, ARRAY_SIZE)
+    out = np.empty_like(energies)
+    return lambda: NeutronConverter.energy_to_velocity(energies, out=out)
+
+
+@benchmark('array.energy_to_velocity_float32', elements=ARRAY_SIZE)
+def _():
+    energies = np.linspace(0.1, 1000, ARRAY_SIZE, dtype=np.float32)
+    out = np.empty_like(energies)
+    return lambda: NeutronConverter.energy_to_velocity(energies, out=out)
+
+
+@benchmark('array.convert_all', elements=ARRAY_SIZE)
+def _():
+    wavelengths = np.linspace(0.5, 20, ARRAY_SIZE)
+    out = np.empty((3, ARRAY_SIZE))
+    return lambda: NeutronConverter.convert_all('wavelength', wavelengths, out=out)
+
+
+@benchmark('array.tof_wavelength', elements=ARRAY_SIZE)
+def _():
+    rng = np.random.default_rng(0)
+    converter = TofConverter(rng.uniform(10, 12, 100_000))
+    pixel_ids = rng.integers(0, 100_000, ARRAY_SIZE, dtype=np.uint32)
+    tof = rng.uniform(1000, 20000, ARRAY_SIZE)
+    out = np.empty(ARRAY_SIZE)
+    return lambda: converter.wavelength(pixel_ids, tof, out=out)
+
+
+@benchmark('array.rebin_tof_energy', elements=ARRAY_SIZE)
+def _():
+    rng = np.random.default_rng(0)
+    counts = rng.poisson(50, (1000, 1000)).astype(np.float64)
+    tof_edges = np.linspace(1000, 20000, 1001)
+    flight_paths = rng.uniform(10, 12, 1000)
+    energy_edges = np.geomspace(1, 400, 1001)
+    return lambda: rebin_histogram(counts, tof_edges, 'tof', 'energy', energy_edges, flight_paths=flight_paths)
+
+
+def _concurrent(convert, threads=16, calls=50):
+    """Return a callable that runs calls conversions on each of several threads."""
+    def work():
+        for _ in range(calls):
+            convert()
+    
+    def run_threads():
+        workers = [threading.Thread(target=work) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    return run_threads
+
+
+@benchmark('concurrent.full_direct', elements=800)
+def _():
+    return _concurrent(lambda: _full_conversion_kernel('energy', np.array([25.0])))
+
+
+@benchmark('concurrent.full_coalesced', elements=800)
+def _():
+    batcher = MicroBatcher(_full_conversion_kernel, window=200e-6, max_size=256)
+    return _concurrent(lambda: batcher.submit('energy', 25.0))
+
+
+def _python(*args):
+    """Return a callable that runs a fresh interpreter in this directory with the given arguments."""
+    command = [sys.executable, *args]
+    directory = os.path.dirname(os.path.abspath(__file__))
+    return lambda: subprocess.run(command, cwd=directory, stdout=subprocess.DEVNULL, check=True)
+
+
+@benchmark('startup.import_kernels')
+def _():
+    return _python('-c', 'import neutron')
+
+
+@benchmark('startup.cli')
+def _():
+    return _python('-m', 'app', 'convert', '--help')
+
+
+@benchmark('startup.create_app')
+def _():
+    return _python('-c', 'import web; web.create_app()')
+
+
+@benchmark('startup.app_factory')
+def _():
+    return create_app
+
+
+def _client_post(url, **kwargs):
+    """Return a callable that POSTs to url through the Flask test client."""
+    client = app.test_client()
+    return lambda: client.post(url, **kwargs)
+
+
+@benchmark('client.health')
+def _():
+    client = app.test_client()
+    return lambda: client.get('/health')
+
+
+@benchmark('client.full_post')
+def _():
+    return _client_post('/convert/full', json={'energy': 25})
+
+
+@benchmark('client.full_get')
+def _():
+    client = app.test_client()
+    return lambda: client.get('/convert/full?energy=25')
+
+
+@benchmark('client.energy_to_wavelength')
+def _():
+    return _client_post('/convert/energy-to-wavelength', json={'energy': 25})
+
+
+@benchmark('client.batch_json', elements=BATCH_SIZE)
+def _():
+    return _client_post('/convert/batch', json={'energy': np.linspace(0.1, 1000, BATCH_SIZE).tolist()})
+
+
+@benchmark('client.batch_binary', elements=BATCH_SIZE)
+def _():
+    return _client_post('/convert/batch?quantity=energy',
+                        data=np.linspace(0.1, 1000, BATCH_SIZE).tobytes(),
+                        content_type='application/octet-stream',
+                        headers={'Accept': 'application/octet-stream'})
+
+
+class LocalServer:
+    """A threaded Werkzeug server running the app on a free local port."""
+    
+    def __init__(self):
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        self.server = make_server('127.0.0.1', 0, app, threaded=True)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+    
+    def connection(self):
+        """Return a keep-alive HTTP connection to the server."""
+        return http.client.HTTPConnection('127.0.0.1', self.server.port)
+    
+    def close(self):
+        self.server.shutdown()
+
+
+_server = None
+
+
+def _server_request(method, url, body=None, headers=None):
+    """Return a callable that sends one request to the local server over a kept-alive connection."""
+    global _server
+    if _server is None:
+        _server = LocalServer()
+    connection = _server.connection()
+    
+    def send():
+        connection.request(method, url, body=body, headers=headers or {})
+        response = connection.getresponse()
+        response.read()
+    return send
+
+
+@benchmark('server.full_post')
+def _():
+    return _server_request('POST', '/convert/full', body=json.dumps({'energy': 25}),
+                           headers={'Content-Type': 'application/json'})
+
+
+@benchmark('server.full_get')
+def _():
+    return _server_request('GET', '/convert/full?energy=25')
+
+
+@benchmark('server.batch_binary', elements=BATCH_SIZE)
+def _():
+    return _server_request('POST', '/convert/batch?quantity=energy',
+                           body=np.linspace(0.1, 1000, BATCH_SIZE).tobytes(),
+                           headers={'Content-Type': 'application/octet-stream',
+                                    'Accept': 'application/octet-stream'})
+
+
+def run(names=None, min_time=0.2, repeat=5):
+    """Run benchmarks and return their best throughput in operations (or elements) per second."""
+    results = {}
+    for name, (setup, elements) in BENCHMARKS.items():
+        if names and not any(pattern in name for pattern in names):
+            continue
+        timer = timeit.Timer(setup())
+        number, _ = timer.autorange()
+        number = max(1, int(number * min_time / 0.2))
+        best = min(timer.repeat(repeat=repeat, number=number)) / number
+        results[name] = elements / best
+    return results
+
+
+def compare(baseline, results, threshold):
+    """Return (name, baseline, current, change) for benchmarks slower than baseline by more than threshold."""
+    regressions = []
+    for name, current in results.items():
+        if name in baseline:
+            change = current / baseline[name] - 1
+            if change < -threshold:
+                regressions.append((name, baseline[name], current, change))
+    return regressions
+
+
+def main(argv=None):
+    """Run the suite, optionally saving a baseline or failing on regressions against one."""
+    parser = argparse.ArgumentParser(description='Benchmark the neutron converter.')
+    parser.add_argument('patterns', nargs='*', help='only run benchmarks whose name contains one of these')
+    parser.add_argument('--save', metavar='PATH', help='write results to a JSON baseline file')
+    parser.add_argument('--compare', metavar='PATH', help='compare against a JSON baseline file')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='fail when ops/sec drops by more than this fraction (default: %(default)s)')
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='minimum seconds per timing run (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=5, help='timing runs per benchmark (default: %(default)s)')
+    args = parser.parse_args(argv)
+    
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    
+    try:
+        results = run(args.patterns, args.min_time, args.repeat)
+    finally:
+        if _server is not None:
+            _server.close()
+    
+    for name, ops in results.items():
+        line = f'{name:36} {ops:16,.0f} ops/s'
+        if name in baseline:
+            line += f'  {ops / baseline[name] - 1:+7.1%}'
+        print(line)
+    
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+    
+    regressions = compare(baseline, results, args.threshold)
+    for name, before, after, change in regressions:
+        print(f'REGRESSION {name}: {before:,.0f} -> {after:,.0f} ops/s ({change:+.1%})', file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
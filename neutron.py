@@ -0,0 +1,649 @@
+"""
+Neutron conversion kernels and offline file conversion.
+
+Everything here depends only on NumPy, so batch jobs and other tools can
+use the kernels without importing Flask or building the web app:
+
+    from neutron import NeutronConverter, TofConverter, convert_file
+"""
+
+import collections
+import concurrent.futures
+import contextlib
+import csv
+import fractions
+import math
+import operator
+import os
+import re
+import sys
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; CSV rows are then formatted with repr
+    orjson = None
+
+# Physical constants
+PLANCK_CONSTANT = 6.62607015e-34  # J·s
+NEUTRON_MASS = 1.67492749804e-27  # kg
+ANGSTROM_TO_METERS = 1e-10
+MEV_TO_JOULES = 1.602176634e-22  # J per meV
+BOLTZMANN_CONSTANT = 1.380649e-23  # J/K
+
+# Derived coefficients, so that every conversion is a single multiply or divide
+VELOCITY_SQUARED_PER_MEV = 2 * MEV_TO_JOULES / NEUTRON_MASS  # (m/s)² per meV
+MEV_PER_VELOCITY_SQUARED = 0.5 * NEUTRON_MASS / MEV_TO_JOULES  # meV per (m/s)²
+WAVELENGTH_VELOCITY_PRODUCT = PLANCK_CONSTANT / (NEUTRON_MASS * ANGSTROM_TO_METERS)  # Å·m/s
+VELOCITY_PER_SQRT_MEV = math.sqrt(VELOCITY_SQUARED_PER_MEV)  # v = C·√E
+WAVELENGTH_SQRT_ENERGY = WAVELENGTH_VELOCITY_PRODUCT / VELOCITY_PER_SQRT_MEV  # λ = C/√E
+ENERGY_WAVELENGTH_SQUARED = WAVELENGTH_SQRT_ENERGY ** 2  # E = C/λ²
+MICROSECONDS_TO_SECONDS = 1e-6
+KELVIN_PER_MEV = MEV_TO_JOULES / BOLTZMANN_CONSTANT  # T = E / k_B
+THZ_PER_MEV = MEV_TO_JOULES / PLANCK_CONSTANT * 1e-12  # ν = E / h
+
+# Registry of convertible quantities. Every quantity is a power law of the neutron
+# velocity, q = coefficient · v**exponent, so a closed-form kernel between any two of
+# them is derived at import time (see CONVERSION_KERNELS).
+Quantity = collections.namedtuple('Quantity', 'field label unit coefficient exponent allow_zero')
+QUANTITIES = {
+    'energy': Quantity('energy_meV', 'Energy', 'meV', MEV_PER_VELOCITY_SQUARED, 2, True),
+    'velocity': Quantity('velocity_ms', 'Velocity', 'm/s', 1.0, 1, True),
+    'wavelength': Quantity('wavelength_angstrom', 'Wavelength', 'Å', WAVELENGTH_VELOCITY_PRODUCT, -1, False),
+    'wavevector': Quantity('wavevector_inv_angstrom', 'Wavevector', 'Å⁻¹',
+                           2 * math.pi / WAVELENGTH_VELOCITY_PRODUCT, 1, True),
+    'temperature': Quantity('temperature_K', 'Temperature', 'K', KELVIN_PER_MEV * MEV_PER_VELOCITY_SQUARED, 2, True),
+    'frequency': Quantity('frequency_THz', 'Frequency', 'THz', THZ_PER_MEV * MEV_PER_VELOCITY_SQUARED, 2, True),
+    'tof_per_metre': Quantity('tof_per_metre_us_m', 'TOF per metre', 'µs/m', 1 / MICROSECONDS_TO_SECONDS, -1, False),
+}
+QUANTITY_CHOICES = ', '.join(list(QUANTITIES)[:-1]) + ', or ' + list(QUANTITIES)[-1]
+
+# Validation rules of each quantity, as used by the dashboard:
+# parameter -> (smallest allowed value is zero, error message)
+VALIDATION_RULES = {
+    name: (quantity.allow_zero, f"{quantity.label} must be {'non-negative' if quantity.allow_zero else 'positive'}")
+    for name, quantity in QUANTITIES.items()
+}
+
+# Reasons validate_values rejects an input, by the code it reports (VALID for valid inputs)
+VALID, NOT_A_NUMBER, NOT_FINITE, OUT_OF_RANGE, DIVERGENT = range(5)
+
+
+def validation_messages(label, allow_zero):
+    """Return the error message for each validation code of a quantity, None for VALID."""
+    return (None, f'{label} must be a number', f'{label} must be finite',
+            f"{label} must be {'non-negative' if allow_zero else 'positive'}", f'{label} must be positive')
+
+
+# Error messages of each quantity, indexed by validation code
+VALIDATION_MESSAGES = {
+    name: validation_messages(quantity.label, quantity.allow_zero) for name, quantity in QUANTITIES.items()
+}
+
+# Quantities converted by the batch route and the file conversion commands
+BATCH_OUTPUT_QUANTITIES = ('energy', 'velocity', 'wavelength')
+BATCH_OUTPUT_FIELDS = tuple(QUANTITIES[name].field for name in BATCH_OUTPUT_QUANTITIES)
+
+# Number of elements converted per chunk by the file conversion command
+CONVERT_CHUNK_SIZE = 1 << 20
+
+# Bytes of CSV text handed to a worker process at a time by the CSV conversion command,
+# and chunks queued per worker so that reading stays ahead of converting
+CSV_CHUNK_BYTES = 1 << 20
+CSV_CHUNKS_PER_WORKER = 2
+
+
+def _is_scalar(value, out, dtype):
+    """Return True if a conversion can take the plain-Python scalar path."""
+    return out is None and dtype is None and isinstance(value, (int, float))
+
+
+def _is_number(value):
+    """Return True for an int or float, which excludes booleans."""
+    return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool)
+
+
+def _to_float(value):
+    """Convert a number to float, with integers beyond the float range as infinities."""
+    try:
+        return float(value)
+    except OverflowError:
+        return math.inf if value > 0 else -math.inf
+
+
+def _as_numbers(values):
+    """Return a list or array as a float64 array and a mask of its numbers, None if all are.
+
+    Elements that are not numbers (strings, booleans, None, nested lists) become NaN,
+    and integers beyond the float range become infinities.
+    """
+    if isinstance(values, np.ndarray):
+        if values.dtype.kind in 'fiu':
+            return values.astype(np.float64, copy=False), None
+        return np.full(values.shape, np.nan), np.zeros(values.shape, dtype=bool)
+    if set(map(type, values)) <= {int, float}:
+        try:
+            return np.fromiter(values, dtype=np.float64, count=len(values)), None
+        except OverflowError:  # an integer beyond the float range; convert element by element
+            pass
+    numbers = np.fromiter(map(_is_number, values), dtype=bool, count=len(values))
+    result = np.full(len(values), np.nan)
+    result[numbers] = [_to_float(value) for value, number in zip(values, numbers) if number]
+    return result, numbers
+
+
+def validate_values(quantity, values, target=None):
+    """Check inputs of a quantity for type, finiteness and range.
+
+    ``values`` is a number, a list (such as a parsed JSON array, which may
+    hold anything) or an array. Non-numbers, booleans included, are
+    NOT_A_NUMBER; NaN, infinities and integers beyond the float range are
+    NOT_FINITE; values below the quantity's smallest allowed value are
+    OUT_OF_RANGE; and with a ``target``, zeros where the target diverges are
+    DIVERGENT. Arrays are checked in one vectorized pass. Returns a tuple of (values, codes): the
+    values as float64, with non-numbers as NaN, and the validation code of
+    each element, VALID (0) for valid ones. For a scalar both are Python
+    numbers.
+    """
+    allow_zero = QUANTITIES[quantity].allow_zero
+    divergent = target is not None and QUANTITIES[target].exponent * QUANTITIES[quantity].exponent < 0
+    if not isinstance(values, (list, tuple, np.ndarray)):
+        if not _is_number(values):
+            return math.nan, NOT_A_NUMBER
+        value = _to_float(values)
+        if not math.isfinite(value):
+            return value, NOT_FINITE
+        if value < 0 or (value == 0 and not allow_zero):
+            return value, OUT_OF_RANGE
+        return value, DIVERGENT if value == 0 and divergent else VALID
+    
+    values, numbers = _as_numbers(values)
+    codes = np.zeros(values.shape, dtype=np.int8)
+    with np.errstate(invalid='ignore'):
+        valid = values >= 0 if allow_zero and not divergent else values > 0
+        valid &= values < np.inf
+    if not valid.all():
+        invalid = ~valid
+        rejected = values[invalid]
+        rejected_codes = np.full(rejected.shape, OUT_OF_RANGE, dtype=np.int8)
+        if allow_zero:
+            rejected_codes[rejected == 0] = DIVERGENT
+        rejected_codes[~np.isfinite(rejected)] = NOT_FINITE
+        if numbers is not None:
+            rejected_codes[~numbers[invalid]] = NOT_A_NUMBER
+        codes[invalid] = rejected_codes
+    return values, codes
+
+
+def _floating(values, dtype):
+    """Return array input as a float array, so kernels that work in place never write into integers."""
+    values = np.asarray(values, dtype=dtype)
+    return values if values.dtype.kind == 'f' else values.astype(np.float64)
+
+
+def _reuse(ufunc, result, *args):
+    """Apply a ufunc to an intermediate result, writing into its buffer when it has one."""
+    if isinstance(result, np.ndarray):
+        return ufunc(result, *args, out=result)
+    return ufunc(result, *args)
+
+
+def _passthrough(values, out):
+    """Return values, copied into out when an output buffer is given."""
+    if out is None:
+        return values
+    np.copyto(out, values, casting='same_kind')
+    return out
+
+
+def _rdivide(numerator, result):
+    """Compute numerator / result, writing into the buffer of result when it has one."""
+    if isinstance(result, np.ndarray):
+        return np.divide(numerator, result, out=result)
+    return np.divide(numerator, result)
+
+
+class NeutronConverter:
+    """Convert between neutron energy, velocity, and wavelength.
+
+    Every method accepts a Python scalar, a list or a NumPy array. Scalars
+    return a float; anything else returns an array. Array conversions take
+    an optional ``out`` buffer to write the result into, and an optional
+    ``dtype`` (e.g. ``np.float32``) to compute and store the result in.
+    """
+    
+    @staticmethod
+    def energy_to_velocity(energy_mev, out=None, dtype=None):
+        """Convert energy (meV) to velocity (m/s)."""
+        if _is_scalar(energy_mev, out, dtype):
+            return math.sqrt(energy_mev * VELOCITY_SQUARED_PER_MEV)
+        result = np.multiply(energy_mev, VELOCITY_SQUARED_PER_MEV, out=out, dtype=dtype)
+        return _reuse(np.sqrt, result)
+    
+    @staticmethod
+    def velocity_to_energy(velocity_ms, out=None, dtype=None):
+        """Convert velocity (m/s) to energy (meV)."""
+        if _is_scalar(velocity_ms, out, dtype):
+            return MEV_PER_VELOCITY_SQUARED * velocity_ms ** 2
+        result = np.square(_floating(velocity_ms, dtype), out=out, dtype=dtype)
+        return _reuse(np.multiply, result, MEV_PER_VELOCITY_SQUARED)
+    
+    @staticmethod
+    def velocity_to_wavelength(velocity_ms, out=None, dtype=None):
+        """Convert velocity (m/s) to wavelength (Angstroms)."""
+        if _is_scalar(velocity_ms, out, dtype):
+            return WAVELENGTH_VELOCITY_PRODUCT / velocity_ms
+        return np.divide(WAVELENGTH_VELOCITY_PRODUCT, velocity_ms, out=out, dtype=dtype)
+    
+    @staticmethod
+    def wavelength_to_velocity(wavelength_angstrom, out=None, dtype=None):
+        """Convert wavelength (Angstroms) to velocity (m/s)."""
+        if _is_scalar(wavelength_angstrom, out, dtype):
+            return WAVELENGTH_VELOCITY_PRODUCT / wavelength_angstrom
+        return np.divide(WAVELENGTH_VELOCITY_PRODUCT, wavelength_angstrom, out=out, dtype=dtype)
+    
+    @staticmethod
+    def energy_to_wavelength(energy_mev, out=None, dtype=None):
+        """Convert energy (meV) to wavelength (Angstroms)."""
+        if _is_scalar(energy_mev, out, dtype):
+            return WAVELENGTH_SQRT_ENERGY / math.sqrt(energy_mev)
+        result = np.sqrt(energy_mev, out=out, dtype=dtype)
+        return _rdivide(WAVELENGTH_SQRT_ENERGY, result)
+    
+    @staticmethod
+    def wavelength_to_energy(wavelength_angstrom, out=None, dtype=None):
+        """Convert wavelength (Angstroms) to energy (meV)."""
+        if _is_scalar(wavelength_angstrom, out, dtype):
+            return ENERGY_WAVELENGTH_SQUARED / wavelength_angstrom ** 2
+        result = np.square(_floating(wavelength_angstrom, dtype), out=out, dtype=dtype)
+        return _rdivide(ENERGY_WAVELENGTH_SQUARED, result)
+    
+    @staticmethod
+    def convert_all(quantity, values, dtype=None, out=None):
+        """Convert one quantity to energy (meV), velocity (m/s) and wavelength (Angstroms).
+
+        ``quantity`` is any key of QUANTITIES. From energy, velocity or
+        wavelength, all three outputs are derived from a single square root or
+        reciprocal of the input, so they agree with each other to the last bit
+        instead of drifting through chained conversions; other quantities go
+        through their direct kernels. ``out`` may be a (3, n) array or a
+        sequence of three arrays to write (energy, velocity, wavelength) into.
+        Returns a tuple of (energy, velocity, wavelength); without ``out`` the
+        input is passed through as its own entry.
+        """
+        if quantity not in BATCH_OUTPUT_QUANTITIES:
+            outs = (None, None, None) if out is None else out
+            return tuple(NeutronConverter.convert(quantity, target, values, out=target_out, dtype=dtype)
+                         for target, target_out in zip(BATCH_OUTPUT_QUANTITIES, outs))
+        if _is_scalar(values, out, dtype):
+            if quantity == 'energy':
+                root = math.sqrt(values)
+                return values, VELOCITY_PER_SQRT_MEV * root, WAVELENGTH_SQRT_ENERGY / root
+            if quantity == 'velocity':
+                return MEV_PER_VELOCITY_SQUARED * values ** 2, values, WAVELENGTH_VELOCITY_PRODUCT / values
+            reciprocal = 1.0 / values
+            return (ENERGY_WAVELENGTH_SQUARED * reciprocal ** 2,
+                    WAVELENGTH_VELOCITY_PRODUCT * reciprocal, values)
+
+        values = np.asarray(values, dtype=dtype)
+        if values.dtype.kind != 'f':
+            values = values.astype(np.float64)
+        energy_out, velocity_out, wavelength_out = (None, None, None) if out is None else out
+        if quantity == 'energy':
+            root = np.sqrt(values, out=wavelength_out, dtype=dtype)
+            velocity = np.multiply(root, VELOCITY_PER_SQRT_MEV, out=velocity_out, dtype=dtype)
+            wavelength = _rdivide(WAVELENGTH_SQRT_ENERGY, root)
+            return _passthrough(values, energy_out), velocity, wavelength
+        if quantity == 'velocity':
+            energy = np.square(values, out=energy_out, dtype=dtype)
+            energy = _reuse(np.multiply, energy, MEV_PER_VELOCITY_SQUARED)
+            wavelength = np.divide(WAVELENGTH_VELOCITY_PRODUCT, values, out=wavelength_out, dtype=dtype)
+            return energy, _passthrough(values, velocity_out), wavelength
+        reciprocal = np.divide(1.0, values, out=energy_out, dtype=dtype)
+        velocity = np.multiply(reciprocal, WAVELENGTH_VELOCITY_PRODUCT, out=velocity_out, dtype=dtype)
+        energy = _reuse(np.square, reciprocal)
+        energy = _reuse(np.multiply, energy, ENERGY_WAVELENGTH_SQUARED)
+        return energy, velocity, _passthrough(values, wavelength_out)
+    
+    @staticmethod
+    def convert(source, target, values, out=None, dtype=None):
+        """Convert values of one quantity to another with their precompiled kernel.
+
+        ``source`` and ``target`` are keys of QUANTITIES, e.g.
+        ``convert('energy', 'temperature', 25)``. Scalars, ``out`` and
+        ``dtype`` behave as in the pairwise methods.
+        """
+        return CONVERSION_KERNELS[source, target](values, out=out, dtype=dtype)
+    
+    @staticmethod
+    def propagate_uncertainty(source, target, values, uncertainties, out=None, dtype=None):
+        """Propagate standard uncertainties of source values to the target quantity.
+
+        Each kernel is a power law K·x**r, so its Jacobian is r·K·x**(r-1)
+        and the target uncertainty is |r·K·x**(r-1)|·σ. This is the
+        first-order propagation a Monte Carlo over normally distributed
+        inputs converges to when σ is small relative to the value, computed
+        in one vectorized pass. ``uncertainties`` is a scalar or an array
+        broadcastable against ``values``. Where the derivative diverges (zero
+        energy to velocity, say) the uncertainty is infinite.
+        """
+        scalar = _is_scalar(values, out, dtype) and isinstance(uncertainties, (int, float))
+        if source == target:
+            return abs(uncertainties) if scalar else np.abs(uncertainties, out=out, dtype=dtype)
+        coefficient, exponent = CONVERSION_POWERS[source, target]
+        slope = abs(float(exponent) * coefficient)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if scalar:
+                return float(slope * np.float64(values) ** float(exponent - 1) * uncertainties)
+            derivative = np.power(values, float(exponent - 1), out=out, dtype=dtype)
+            derivative = _reuse(np.multiply, derivative, slope)
+            return _reuse(np.multiply, derivative, uncertainties)
+
+
+# Scalar and array implementations of |exponent| for the kernel exponents that occur
+# between power laws of velocity with exponents 2, 1 and -1
+_KERNEL_POWERS = {
+    1: (None, None),
+    2: (lambda x: x * x, np.square),
+    fractions.Fraction(1, 2): (math.sqrt, np.sqrt),
+}
+
+
+def _power_kernel(coefficient, exponent):
+    """Return a kernel computing coefficient · x**exponent in one power and one multiply or divide."""
+    scalar_power, array_power = _KERNEL_POWERS[abs(exponent)]
+    
+    def kernel(values, out=None, dtype=None):
+        if _is_scalar(values, out, dtype):
+            power = values if scalar_power is None else scalar_power(values)
+            return coefficient * power if exponent > 0 else coefficient / power
+        if array_power is None:
+            if exponent > 0:
+                return np.multiply(values, coefficient, out=out, dtype=dtype)
+            return np.divide(coefficient, values, out=out, dtype=dtype)
+        power = array_power(_floating(values, dtype), out=out, dtype=dtype)
+        return _reuse(np.multiply, power, coefficient) if exponent > 0 else _rdivide(coefficient, power)
+    return kernel
+
+
+def _conversion_powers(quantities):
+    """Derive the power law for every ordered pair of distinct quantities.
+
+    With source = a·v**p and target = b·v**q, target = (b / a**(q/p)) · source**(q/p).
+    Returns a dict mapping (source, target) to (coefficient, exponent).
+    """
+    powers = {}
+    for source, source_spec in quantities.items():
+        for target, target_spec in quantities.items():
+            if source != target:
+                exponent = fractions.Fraction(target_spec.exponent, source_spec.exponent)
+                coefficient = target_spec.coefficient / source_spec.coefficient ** float(exponent)
+                powers[source, target] = (coefficient, exponent)
+    return powers
+
+
+CONVERSION_POWERS = _conversion_powers(QUANTITIES)
+CONVERSION_KERNELS = {pair: _power_kernel(*power) for pair, power in CONVERSION_POWERS.items()}
+
+
+class TofConverter:
+    """Convert time-of-flight detector events to wavelength, velocity and energy.
+
+    The converter holds a per-pixel table of total flight paths (L1 + L2, in
+    metres) indexed by pixel id, and precomputes one conversion factor per
+    pixel. Converting an event list is then a single gather of those factors
+    by pixel id followed by an element-wise multiply or divide with the
+    time of flight (µs), with no per-event Python work.
+    """
+    
+    def __init__(self, flight_paths, dtype=np.float64):
+        """Build the per-pixel conversion factors from flight paths (m) indexed by pixel id."""
+        flight_paths = np.asarray(flight_paths, dtype=np.float64)
+        if flight_paths.ndim != 1:
+            raise ValueError('Flight paths must be a 1-D array indexed by pixel id')
+        self.flight_paths = flight_paths
+        self.dtype = np.dtype(dtype)
+        with np.errstate(divide='ignore'):
+            # λ = (h/m) t / L, v = L / t and E = C / λ², per pixel
+            self._wavelength_factors = (WAVELENGTH_VELOCITY_PRODUCT * MICROSECONDS_TO_SECONDS
+                                        / flight_paths).astype(self.dtype)
+            self._velocity_factors = (flight_paths / MICROSECONDS_TO_SECONDS).astype(self.dtype)
+            self._energy_factors = (ENERGY_WAVELENGTH_SQUARED
+                                    / (WAVELENGTH_VELOCITY_PRODUCT * MICROSECONDS_TO_SECONDS
+                                       / flight_paths) ** 2).astype(self.dtype)
+    
+    @classmethod
+    def from_file(cls, path, dtype=np.float64):
+        """Load a flight-path table from an .npy file or a text file.
+
+        An .npy file holds the flight paths indexed by pixel id. A text file
+        holds either one flight path per line, or two columns of pixel id and
+        flight path; pixels missing from a two-column table convert to NaN.
+        Pixel ids must be non-negative integers.
+        """
+        if str(path).endswith('.npy'):
+            return cls(np.load(path), dtype=dtype)
+        table = np.loadtxt(path, delimiter=',' if str(path).endswith('.csv') else None, ndmin=2)
+        if table.shape[1] == 1:
+            return cls(table[:, 0], dtype=dtype)
+        if not ((table[:, 0] >= 0) & (table[:, 0] == np.floor(table[:, 0]))).all():
+            raise ValueError('Pixel ids must be non-negative integers')
+        pixel_ids = table[:, 0].astype(np.intp)
+        flight_paths = np.full(pixel_ids.max() + 1, np.nan)
+        flight_paths[pixel_ids] = table[:, 1]
+        return cls(flight_paths, dtype=dtype)
+    
+    @property
+    def pixel_count(self):
+        """Number of pixels in the flight-path table."""
+        return self.flight_paths.size
+    
+    def _convert(self, factors, pixel_ids, tof_us, out, divide):
+        """Gather per-pixel factors into out and combine them with the times of flight.
+
+        Pixel ids outside the table raise IndexError; negative ids would
+        otherwise count back from the end of the table.
+        """
+        pixel_ids = np.asarray(pixel_ids)
+        if pixel_ids.size and pixel_ids.min() < 0:
+            raise IndexError('Pixel ids must be non-negative')
+        out = np.take(factors, pixel_ids, out=out)
+        if divide:
+            return np.divide(out, tof_us, out=out)
+        return np.multiply(out, tof_us, out=out)
+    
+    def wavelength(self, pixel_ids, tof_us, out=None):
+        """Convert events (pixel id, time of flight in µs) to wavelength (Angstroms)."""
+        return self._convert(self._wavelength_factors, pixel_ids, tof_us, out, divide=False)
+    
+    def velocity(self, pixel_ids, tof_us, out=None):
+        """Convert events (pixel id, time of flight in µs) to velocity (m/s)."""
+        return self._convert(self._velocity_factors, pixel_ids, tof_us, out, divide=True)
+    
+    def energy(self, pixel_ids, tof_us, out=None):
+        """Convert events (pixel id, time of flight in µs) to energy (meV)."""
+        out = self._convert(self._energy_factors, pixel_ids, tof_us, out, divide=True)
+        return np.divide(out, tof_us, out=out)
+
+
+def _open_output(path, shape, npy):
+    """Create a writable memory-mapped float64 output file."""
+    if npy:
+        return np.lib.format.open_memmap(path, mode='w+', dtype='<f8', shape=shape)
+    return np.memmap(path, dtype='<f8', mode='w+', shape=shape)
+
+
+def convert_file(path, quantity, output_dir=None, chunk_size=CONVERT_CHUNK_SIZE, raw_dtype='<f8'):
+    """Convert a file of energies, velocities or wavelengths to all three properties.
+
+    The input is an .npy file or a raw binary file of ``raw_dtype`` values.
+    It is memory-mapped and converted ``chunk_size`` elements at a time
+    straight into memory-mapped output files, so memory use is bounded by the
+    chunk size rather than the file size. One float64 output file per
+    property is written next to the input (or into ``output_dir``), named
+    ``<stem>_<property><ext>``. Returns the list of output paths.
+    """
+    npy = path.endswith('.npy')
+    if npy:
+        values = np.load(path, mmap_mode='r')
+    elif os.path.getsize(path):
+        values = np.memmap(path, dtype=raw_dtype, mode='r')
+    else:
+        values = np.empty(0, dtype=raw_dtype)
+    values = values.reshape(-1)
+    
+    stem, ext = os.path.splitext(os.path.basename(path))
+    output_dir = output_dir or os.path.dirname(path) or '.'
+    output_paths = [os.path.join(output_dir, f'{stem}_{field}{ext}') for field in BATCH_OUTPUT_FIELDS]
+    if not values.size:
+        for output_path in output_paths:
+            if npy:
+                np.save(output_path, np.empty(0, dtype='<f8'))
+            else:
+                open(output_path, 'wb').close()
+        return output_paths
+    
+    outputs = [_open_output(output_path, values.shape, npy) for output_path in output_paths]
+    for start in range(0, values.size, chunk_size):
+        chunk, codes = validate_values(quantity, values[start:start + chunk_size])
+        invalid = np.flatnonzero(codes)
+        if invalid.size:
+            message = VALIDATION_MESSAGES[quantity][codes[invalid[0]]]
+            raise ValueError(f'{message} (element {start + invalid[0]})')
+        with np.errstate(divide='ignore'):
+            NeutronConverter.convert_all(
+                quantity, chunk, out=[output[start:start + chunk.size] for output in outputs])
+    for output in outputs:
+        output.flush()
+    return output_paths
+
+
+# orjson spells floats below 1e-4 positionally and exponents without padding
+# (0.00001, 2.5e-7, 1e16); repr writes 1e-05, 2.5e-07, 1e+16.
+_ORJSON_UNLIKE_REPR = re.compile(r'(?<![\d.])-?(?:0\.0000\d+|\d+(?:\.\d+)?e-?\d+)(?![\d.e])')
+
+
+def _format_rows(results, separator):
+    """Format an (n, 3) float array as delimited rows of shortest round-trip floats.
+
+    Values are spelled as repr spells them, with or without orjson. Non-finite
+    values (the wavelength of a neutron at rest) become empty fields.
+    """
+    if orjson is not None:
+        text = orjson.dumps(results, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+        text = text[2:-2].replace('null', '').replace('],[', '\n')
+        text = _ORJSON_UNLIKE_REPR.sub(lambda match: repr(float(match.group())), text)
+        if separator != ',':
+            text = text.replace(',', separator)
+        return text.split('\n')
+    return [separator.join(repr(value) if math.isfinite(value) else '' for value in row)
+            for row in results.tolist()]
+
+
+def _convert_csv_chunk(text, first_line, quantity, column, delimiter):
+    """Convert a block of CSV lines, returning them with the three properties appended.
+
+    Runs in a worker process of convert_csv and returns the output text and
+    its number of rows. Blank lines are dropped; invalid values raise
+    ValueError naming their 1-based line number.
+    """
+    lines = text.split('\n')
+    if not lines[-1]:
+        lines.pop()
+    if '\r' in text:
+        lines = [line.rstrip('\r') for line in lines]
+    numbers = range(first_line, first_line + len(lines))
+    if not all(map(str.strip, lines)):
+        numbers = [number for number, line in zip(numbers, lines) if line.strip()]
+        lines = [line for line in lines if line.strip()]
+    if not lines:
+        return '', 0
+    rows = csv.reader(lines, delimiter=delimiter) if delimiter else map(str.split, lines)
+    try:
+        cells = list(map(operator.itemgetter(column), rows))
+    except IndexError:
+        rows = csv.reader(lines, delimiter=delimiter) if delimiter else map(str.split, lines)
+        bad = next(index for index, row in enumerate(rows) if len(row) <= column)
+        raise ValueError(f'Line {numbers[bad]}: no column {column}') from None
+    try:
+        values = np.array(cells, dtype=np.float64)
+    except ValueError:
+        bad = next(index for index, cell in enumerate(cells) if not _is_float(cell))
+        raise ValueError(f'Line {numbers[bad]}: {cells[bad]!r} is not a number') from None
+    
+    values, codes = validate_values(quantity, values)
+    invalid = np.flatnonzero(codes)
+    if invalid.size:
+        raise ValueError(f'Line {numbers[invalid[0]]}: {VALIDATION_MESSAGES[quantity][codes[invalid[0]]]}')
+    results = np.empty((values.size, 3))
+    with np.errstate(divide='ignore'):
+        NeutronConverter.convert_all(quantity, values, out=results.T)
+    separator = delimiter or ' '
+    converted = _format_rows(results, separator)
+    return ''.join([f'{line}{separator}{row}\n' for line, row in zip(lines, converted)]), len(lines)
+
+
+def _is_float(text):
+    """Return True if text parses as a float."""
+    try:
+        float(text)
+    except ValueError:
+        return False
+    return True
+
+
+def convert_csv(path, quantity, column=None, output_path=None, workers=None, delimiter=',',
+                chunk_bytes=CSV_CHUNK_BYTES):
+    """Append energy, velocity and wavelength columns to a CSV or whitespace-delimited text file.
+
+    ``column`` is the header name of the input column (default: the
+    quantity's name) or, for files without a header, its 0-based index.
+    The input is read in blocks of about ``chunk_bytes`` whole lines, which
+    are parsed, converted and formatted across a pool of ``workers``
+    processes (default: one per CPU) and written to ``output_path`` (default
+    ``<stem>_converted<ext>`` next to the input, '-' for stdout) in the
+    original order. At most CSV_CHUNKS_PER_WORKER blocks per worker are in
+    flight, so memory use does not grow with the file size, and the parent
+    only reads and writes text. ``delimiter`` None splits on whitespace.
+    Returns the output path and the number of rows converted.
+    """
+    workers = workers or os.cpu_count() or 1
+    if output_path is None:
+        stem, ext = os.path.splitext(path)
+        output_path = f'{stem}_converted{ext or ".csv"}'
+    rows = 0
+    with contextlib.ExitStack() as stack:
+        source = stack.enter_context(open(path, newline=''))
+        target = sys.stdout if output_path == '-' else stack.enter_context(open(output_path, 'w', newline=''))
+        separator = delimiter or ' '
+        line_number = 1
+        if not isinstance(column, int):
+            header = source.readline()
+            line_number += 1
+            names = next(csv.reader([header], delimiter=delimiter)) if delimiter else header.split()
+            names = [name.strip() for name in names]
+            column = column or quantity
+            if column not in names:
+                raise ValueError(f'Line 1: no column named {column!r}')
+            column = names.index(column)
+            target.write(header.rstrip('\r\n') + separator + separator.join(BATCH_OUTPUT_FIELDS) + '\n')
+        
+        pool = stack.enter_context(concurrent.futures.ProcessPoolExecutor(workers)) if workers > 1 else None
+        pending = collections.deque()
+        while True:
+            text = source.read(chunk_bytes)
+            if text and not text.endswith('\n'):
+                text += source.readline()
+            if text:
+                args = (text, line_number, quantity, column, delimiter)
+                pending.append(pool.submit(_convert_csv_chunk, *args) if pool else args)
+                line_number += text.count('\n')
+            # Write finished blocks in order, keeping a bounded number of blocks in flight
+            while pending and (not text or len(pending) >= workers * CSV_CHUNKS_PER_WORKER):
+                chunk = pending.popleft()
+                output, count = chunk.result() if pool else _convert_csv_chunk(*chunk)
+                rows += count
+                target.write(output)
+            if not text:
+                break
+    return output_path, rows
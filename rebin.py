@@ -0,0 +1,156 @@
+"""
+Count-conserving histogram rebinning between neutron axes.
+
+A histogram over time of flight, wavelength, energy or any other quantity
+in QUANTITIES can be moved to another axis. Bin edges are mapped with the
+NeutronConverter kernels, and counts are redistributed onto an arbitrary
+target grid. The target edges are mapped back onto the source axis, and each
+source bin contributes in proportion to its overlap there. This is the exact
+Jacobian of the mapping for counts spread uniformly within each source bin,
+so the total is conserved whatever the curvature of the conversion.
+
+Histograms may be 1-D or 2-D (spectrum × bins), with edges shared by all
+spectra or given per spectrum. Every step is a whole-array NumPy operation,
+so there is no per-spectrum Python overhead.
+
+    edges, counts = rebin_histogram(counts, tof_edges, 'tof', 'wavelength', flight_paths=l_total)
+    counts = rebin_histogram(counts, tof_edges, 'tof', 'energy', energy_grid, flight_paths=l_total)
+"""
+
+import numpy as np
+
+from neutron import NeutronConverter, QUANTITIES
+
+# Axis for time of flight (µs); it is TOF per metre scaled by the flight path (m)
+TOF_AXIS = 'tof'
+
+
+def convert_axis(source, target, values, flight_paths=None):
+    """Convert axis values between quantities.
+
+    ``source`` and ``target`` are keys of QUANTITIES or 'tof', the time of
+    flight in µs. The 'tof' axis needs ``flight_paths`` in metres. This is one
+    total flight path, or one per spectrum, for values of shape
+    (spectra, n).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if TOF_AXIS in (source, target):
+        if flight_paths is None:
+            raise ValueError('Converting time of flight requires flight_paths')
+        flight_paths = np.asarray(flight_paths, dtype=np.float64)
+        if flight_paths.ndim:
+            flight_paths = flight_paths[:, np.newaxis]
+    if source == TOF_AXIS:
+        values = values / flight_paths
+        source = 'tof_per_metre'
+    to = 'tof_per_metre' if target == TOF_AXIS else target
+    with np.errstate(divide='ignore'):
+        result = values if source == to else NeutronConverter.convert(source, to, values)
+    if target == TOF_AXIS:
+        result = result * flight_paths
+    return result
+
+
+def _searchsorted_rows(edges, positions):
+    """Row-wise np.searchsorted(edges[i], positions[i], side='right') as a vectorized bisection."""
+    low = np.zeros(positions.shape, dtype=np.intp)
+    high = np.full(positions.shape, edges.shape[-1], dtype=np.intp)
+    for _ in range(int(edges.shape[-1]).bit_length()):
+        middle = (low + high) // 2
+        right = np.take_along_axis(edges, np.minimum(middle, edges.shape[-1] - 1), axis=-1) <= positions
+        right &= middle < high
+        low = np.where(right, middle + 1, low)
+        high = np.where(right, high, middle)
+    return low
+
+
+def _ascending(counts, edges):
+    """Return counts and edges reversed along the bin axis when the edges decrease."""
+    if edges[..., -1].mean() < edges[..., 0].mean():
+        return counts[..., ::-1], edges[..., ::-1]
+    return counts, edges
+
+
+def rebin(counts, edges, target_edges):
+    """Redistribute histogram counts onto new bin edges on the same axis.
+
+    ``counts`` has shape (n,) or (spectra, n); ``edges`` and ``target_edges``
+    have shape (n + 1,) or (spectra, n + 1), and either may run in increasing
+    or decreasing order. Counts are assumed uniform within each bin, so each
+    source bin contributes its overlap fraction to every target bin.
+    Target ranges outside the source edges receive no counts, and counts
+    outside the target range are dropped. Returns an array of shape (m,) or
+    (spectra, m), ordered like target_edges.
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    edges = np.asarray(edges, dtype=np.float64)
+    target_edges = np.asarray(target_edges, dtype=np.float64)
+    if edges.shape[-1] != counts.shape[-1] + 1:
+        raise ValueError('Edges must have one more entry than counts along the bin axis')
+    if target_edges.shape[-1] < 2:
+        raise ValueError('Target edges must hold at least two entries')
+
+    counts, edges = _ascending(counts, edges)
+    reverse = target_edges[..., -1].mean() < target_edges[..., 0].mean()
+    if reverse:
+        target_edges = target_edges[..., ::-1]
+
+    shape = np.broadcast_shapes(counts.shape[:-1], edges.shape[:-1], target_edges.shape[:-1])
+    shared = edges.ndim == 1
+    counts = np.broadcast_to(counts, shape + counts.shape[-1:])
+    positions = np.broadcast_to(target_edges, shape + target_edges.shape[-1:])
+    if shared:
+        positions = np.clip(positions, edges[0], edges[-1])
+        index = np.searchsorted(edges, positions, side='right') - 1
+        edges = np.broadcast_to(edges, shape + edges.shape[-1:])
+    else:
+        edges = np.broadcast_to(edges, shape + edges.shape[-1:])
+        positions = np.clip(positions, edges[..., :1], edges[..., -1:])
+        index = _searchsorted_rows(edges, positions) - 1
+    index = np.clip(index, 0, counts.shape[-1] - 1)
+
+    # Cumulative counts at the target edges, interpolated linearly within each source bin
+    cumulative = np.concatenate([np.zeros(shape + (1,)), np.cumsum(counts, axis=-1)], axis=-1)
+    left = np.take_along_axis(edges, index, axis=-1)
+    width = np.take_along_axis(edges, index + 1, axis=-1) - left
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = np.where(width > 0, (positions - left) / width, 1.0)
+    at_edges = (np.take_along_axis(cumulative, index, axis=-1)
+                + fraction * np.take_along_axis(counts, index, axis=-1))
+    result = np.diff(at_edges, axis=-1)
+    return result[..., ::-1] if reverse else result
+
+
+def rebin_histogram(counts, edges, source, target, target_edges=None, flight_paths=None, density=False):
+    """Move a histogram from one axis to another, conserving counts.
+
+    Without ``target_edges``, the bin edges are converted and the counts
+    keep their bins. This returns (edges, counts) with the edges made
+    ascending, which for a reciprocal mapping such as time of flight to
+    energy reverses both. With ``target_edges``, the counts are redistributed
+    onto that grid of the target quantity, given as (m + 1,) or
+    (spectra, m + 1), and only the counts are returned. With ``density``,
+    counts and results are per unit of their axis rather than per bin. The
+    Jacobian of the mapping is then applied through the bin widths.
+    ``flight_paths`` (m) is required when either axis is 'tof'.
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    edges = np.asarray(edges, dtype=np.float64)
+    for name in (source, target):
+        if name != TOF_AXIS and name not in QUANTITIES:
+            raise ValueError(f'Unknown axis {name!r}')
+    if density:
+        counts = counts * np.abs(np.diff(edges, axis=-1))
+
+    if target_edges is None:
+        new_edges = convert_axis(source, target, edges, flight_paths)
+        counts, new_edges = _ascending(counts, new_edges)
+        if density:
+            counts = counts / np.diff(new_edges, axis=-1)
+        return new_edges, counts
+
+    target_edges = np.asarray(target_edges, dtype=np.float64)
+    result = rebin(counts, edges, convert_axis(target, source, target_edges, flight_paths))
+    if density:
+        result = result / np.abs(np.diff(target_edges, axis=-1))
+    return result
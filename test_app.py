@@ -1,7 +1,23 @@
 import unittest
+import unittest.mock
+import gzip
+import io
 import json
-from app import app, NeutronConverter
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import argparse
+import importlib.util
+import threading
+import time
+from werkzeug.serving import make_server
+import app as app_module
+from app import (app, convert_csv, convert_file, create_app, main, profile_token, MicroBatcher, round_significant,
+                 server_options, validate_values, NeutronConverter, TofConverter, QUANTITIES, SERVER_DEFAULTS)
 import math
+import numpy as np
 
 
 class TestNeutronConverter(unittest.TestCase):
@@ -56,6 +72,432 @@ class TestNeutronConverter(unittest.TestCase):
         wavelength = NeutronConverter.velocity_to_wavelength(original_velocity)
         recovered_velocity = NeutronConverter.wavelength_to_velocity(wavelength)
         self.assertAlmostEqual(original_velocity, recovered_velocity, places=5)
+    
+    def test_array_input(self):
+        """Test conversions accept lists and arrays and match the scalar path."""
+        energies = [1, 25, 100]
+        velocities = NeutronConverter.energy_to_velocity(energies)
+        self.assertIsInstance(velocities, np.ndarray)
+        for energy, velocity in zip(energies, velocities):
+            self.assertEqual(velocity, NeutronConverter.energy_to_velocity(energy))
+        wavelengths = NeutronConverter.energy_to_wavelength(np.array(energies, dtype=float))
+        self.assertAlmostEqual(wavelengths[1], 1.8064, places=2)
+    
+    def test_integer_input(self):
+        """Test every method converts integer lists and arrays like the equal floats."""
+        methods = ['energy_to_velocity', 'velocity_to_energy', 'velocity_to_wavelength',
+                   'wavelength_to_velocity', 'energy_to_wavelength', 'wavelength_to_energy']
+        for name in methods:
+            method = getattr(NeutronConverter, name)
+            for values in ([1000, 2000], np.array([1000, 2000]), [3_000_000_000]):
+                result = method(values)
+                self.assertEqual(result.dtype, np.float64, name)
+                np.testing.assert_array_equal(result, method(np.array(values, dtype=float)), name)
+    
+    def test_out_buffer(self):
+        """Test results are written into a preallocated out= buffer."""
+        wavelengths = np.array([1.8064, 4.0])
+        out = np.empty_like(wavelengths)
+        result = NeutronConverter.wavelength_to_energy(wavelengths, out=out)
+        self.assertIs(result, out)
+        self.assertAlmostEqual(out[0], 25.07, places=1)
+    
+    def test_float32_dtype(self):
+        """Test the dtype argument selects single-precision results."""
+        velocities = NeutronConverter.energy_to_velocity([25.0, 100.0], dtype=np.float32)
+        self.assertEqual(velocities.dtype, np.float32)
+        self.assertAlmostEqual(float(velocities[0]), 2186.967, places=1)
+        out = np.empty(2, dtype=np.float32)
+        NeutronConverter.velocity_to_wavelength(velocities, out=out)
+        self.assertAlmostEqual(float(out[0]), 1.8089, places=3)
+    
+    def test_convert_all(self):
+        """Test the fused kernel agrees with the pairwise conversions."""
+        energy, velocity, wavelength = NeutronConverter.convert_all('energy', 25)
+        self.assertEqual(energy, 25)
+        self.assertAlmostEqual(velocity, NeutronConverter.energy_to_velocity(25), places=9)
+        self.assertAlmostEqual(wavelength, NeutronConverter.energy_to_wavelength(25), places=12)
+        energy, velocity, wavelength = NeutronConverter.convert_all('wavelength', 1.8064)
+        self.assertAlmostEqual(energy, NeutronConverter.wavelength_to_energy(1.8064), places=9)
+        self.assertAlmostEqual(velocity, NeutronConverter.wavelength_to_velocity(1.8064), places=9)
+    
+    def test_convert_all_array(self):
+        """Test the fused kernel on arrays matches its scalar path."""
+        velocities = [500, 2187.928, 5000]
+        energies, _, wavelengths = NeutronConverter.convert_all('velocity', velocities)
+        for velocity, energy, wavelength in zip(velocities, energies, wavelengths):
+            expected = NeutronConverter.convert_all('velocity', velocity)
+            self.assertEqual(energy, expected[0])
+            self.assertEqual(wavelength, expected[2])
+        _, velocities32, _ = NeutronConverter.convert_all('energy', [25.0], dtype=np.float32)
+        self.assertEqual(velocities32.dtype, np.float32)
+    
+    def test_round_trip_energy_wavelength(self):
+        """Test the closed-form energy/wavelength kernels invert each other."""
+        original_energy = 25  # meV
+        wavelength = NeutronConverter.energy_to_wavelength(original_energy)
+        recovered_energy = NeutronConverter.wavelength_to_energy(wavelength)
+        self.assertAlmostEqual(original_energy, recovered_energy, places=12)
+    
+    def test_convert(self):
+        """Test the generated kernels against physical reference values."""
+        self.assertAlmostEqual(NeutronConverter.convert('energy', 'temperature', 25), 290.113, places=3)
+        self.assertAlmostEqual(NeutronConverter.convert('frequency', 'energy', 1), 4.135668, places=6)
+        self.assertAlmostEqual(NeutronConverter.convert('wavelength', 'wavevector', 1.8), 2 * math.pi / 1.8, places=12)
+        self.assertAlmostEqual(NeutronConverter.convert('velocity', 'tof_per_metre', 2000), 500, places=12)
+        self.assertAlmostEqual(NeutronConverter.convert('energy', 'wavelength', 25),
+                               NeutronConverter.energy_to_wavelength(25), places=12)
+    
+    def test_convert_every_pair(self):
+        """Test every pair of kernels agrees with a round trip through velocity."""
+        velocities = np.array([300.0, 2200.0, 8000.0])
+        values = {name: spec.coefficient * velocities ** spec.exponent for name, spec in QUANTITIES.items()}
+        for source in QUANTITIES:
+            for target in QUANTITIES:
+                if source != target:
+                    np.testing.assert_allclose(NeutronConverter.convert(source, target, values[source]),
+                                               values[target], rtol=1e-14, err_msg=f'{source}-to-{target}')
+                    self.assertAlmostEqual(NeutronConverter.convert(source, target, float(values[source][1])),
+                                           values[target][1], delta=1e-14 * values[target][1])
+    
+    def test_convert_integer_input(self):
+        """Test every kernel converts integer lists like the equal floats, without overflow."""
+        for source in QUANTITIES:
+            for target in QUANTITIES:
+                if source != target:
+                    result = NeutronConverter.convert(source, target, [1000, 3_000_000_000])
+                    np.testing.assert_array_equal(
+                        result, NeutronConverter.convert(source, target, np.array([1000.0, 3e9])),
+                        err_msg=f'{source}-to-{target}')
+    
+    def test_convert_all_other_quantities(self):
+        """Test the fused kernel accepts every registered quantity."""
+        out = np.empty((3, 2))
+        NeutronConverter.convert_all('temperature', [290.11295303875204, 100.0], out=out)
+        self.assertAlmostEqual(out[0, 0], 25, places=12)
+        self.assertAlmostEqual(out[2, 0], NeutronConverter.energy_to_wavelength(25), places=12)
+
+
+class TestUncertaintyPropagation(unittest.TestCase):
+    """Unit tests for propagating input uncertainties through the kernels."""
+    
+    def test_power_law(self):
+        """Test relative uncertainties scale with the kernel exponent."""
+        # E ∝ λ⁻², so ΔE/E = 2 Δλ/λ
+        energy = NeutronConverter.convert('wavelength', 'energy', 1.8)
+        sigma = NeutronConverter.propagate_uncertainty('wavelength', 'energy', 1.8, 0.018)
+        self.assertAlmostEqual(sigma / energy, 0.02, places=14)
+        # v ∝ √E, so Δv/v = ½ ΔE/E
+        energies = np.array([4.0, 25.0])
+        sigmas = NeutronConverter.propagate_uncertainty('energy', 'velocity', energies, 0.01 * energies)
+        np.testing.assert_allclose(sigmas / NeutronConverter.convert('energy', 'velocity', energies), 0.005)
+        self.assertEqual(NeutronConverter.propagate_uncertainty('energy', 'energy', 25, -0.5), 0.5)
+        self.assertTrue(math.isinf(NeutronConverter.propagate_uncertainty('energy', 'velocity', 0, 0.1)))
+    
+    def test_matches_monte_carlo(self):
+        """Test the analytic uncertainty agrees with sampling for a narrow distribution."""
+        rng = np.random.default_rng(0)
+        samples = rng.normal(1.8, 0.0018, 200_000)
+        for target in ('energy', 'velocity', 'temperature', 'tof_per_metre'):
+            sampled = NeutronConverter.convert('wavelength', target, samples).std()
+            analytic = NeutronConverter.propagate_uncertainty('wavelength', target, 1.8, 0.0018)
+            self.assertAlmostEqual(sampled / analytic, 1, delta=0.01, msg=target)
+    
+    def test_out_buffer(self):
+        """Test uncertainties can be written into an existing array."""
+        out = np.empty(2)
+        result = NeutronConverter.propagate_uncertainty('velocity', 'wavelength', [1000, 2000], [10, 10], out=out)
+        self.assertIs(result, out)
+        expected = NeutronConverter.convert('velocity', 'wavelength', np.array([1000, 2000])) * [0.01, 0.005]
+        np.testing.assert_allclose(out, expected)
+
+
+class TestRoundSignificant(unittest.TestCase):
+    """Unit tests for rounding response floats."""
+    
+    def test_scalar(self):
+        """Test scalars are rounded to the requested significant digits."""
+        self.assertEqual(round_significant(2186.966813021043, 6), 2186.97)
+        self.assertEqual(round_significant(1.8089136005711297, 3), 1.81)
+        self.assertEqual(round_significant(0.0, 3), 0.0)
+    
+    def test_array(self):
+        """Test arrays round to the shortest float with the requested digits."""
+        values = np.array([2186.966813021043, 1.8089136005711297, 1.234567e-9, 9.87654e21, 0.0, np.inf, np.nan])
+        rounded = round_significant(values, 4)
+        self.assertEqual([repr(value) for value in rounded[:5].tolist()],
+                         ['2187.0', '1.809', '1.235e-09', '9.877e+21', '0.0'])
+        self.assertTrue(np.isinf(rounded[5]))
+        self.assertTrue(np.isnan(rounded[6]))
+    
+    def test_array_matches_scalar(self):
+        """Test arrays round exactly as scalars do, at any magnitude and number of digits."""
+        rng = np.random.default_rng(0)
+        values = np.concatenate([rng.random(20_000) * 10.0 ** rng.integers(-40, 40, 20_000),
+                                 np.round(rng.random(2_000), 4), [1.13e-30, 0.125, 2.5, 1e22, 1.7976931348623157e308]])
+        for digits in (1, 3, 6, 15, 17):
+            expected = [round_significant(value, digits) for value in values.tolist()]
+            self.assertEqual(round_significant(values, digits).tolist(), expected, digits)
+        self.assertEqual(round_significant(np.array([1.1299999999999999e-30]), 3).tolist(), [1.13e-30])
+
+
+class TestValidateValues(unittest.TestCase):
+    """Unit tests for validating scalar and array inputs."""
+    
+    def test_scalar(self):
+        """Test scalars get a single validation code."""
+        self.assertEqual(validate_values('energy', 25), (25.0, app_module.VALID))
+        self.assertEqual(validate_values('energy', -1)[1], app_module.OUT_OF_RANGE)
+        self.assertEqual(validate_values('wavelength', 0)[1], app_module.OUT_OF_RANGE)
+        self.assertEqual(validate_values('energy', 0, 'wavelength')[1], app_module.DIVERGENT)
+        self.assertEqual(validate_values('energy', math.inf)[1], app_module.NOT_FINITE)
+        for value in ('25', True, None, {}):
+            self.assertEqual(validate_values('energy', value)[1], app_module.NOT_A_NUMBER, value)
+    
+    def test_array(self):
+        """Test every element of a list or array is checked in one pass."""
+        values, codes = validate_values('energy', [1, -1, 0, '2', False, None, math.nan, -math.inf, [3]], 'wavelength')
+        self.assertEqual(codes.tolist(), [0, 3, 4, 1, 1, 1, 2, 2, 1])
+        self.assertEqual(values[0], 1.0)
+        self.assertTrue(np.isnan(values[3:6]).all())
+        
+        values, codes = validate_values('wavelength', np.array([1.8, 0.0, 4.0], dtype=np.float32))
+        self.assertEqual(values.dtype, np.float64)
+        self.assertEqual(codes.tolist(), [0, 3, 0])
+        self.assertEqual(validate_values('energy', np.array([True]))[1].tolist(), [app_module.NOT_A_NUMBER])
+
+
+class TestMicroBatcher(unittest.TestCase):
+    """Unit tests for coalescing concurrent scalar conversions."""
+    
+    def test_coalesces_concurrent_requests(self):
+        """Test concurrent submissions share kernel calls and get their own results."""
+        calls = []
+        
+        def kernel(key, values):
+            calls.append(values.size)
+            return np.stack([values, values * key])
+        
+        batcher = MicroBatcher(kernel, window=0.05, max_size=64)
+        results = {}
+        barrier = threading.Barrier(16)
+        
+        def submit(value):
+            barrier.wait()
+            results[value] = batcher.submit(3, value)
+        
+        threads = [threading.Thread(target=submit, args=(float(value),)) for value in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, {float(value): [value, 3 * value] for value in range(16)})
+        stats = batcher.stats()
+        self.assertEqual(stats['requests'], 16)
+        self.assertEqual(sum(calls), 16)
+        self.assertLess(stats['batches'], 16)
+        self.assertEqual(stats['max_batch_size'], max(calls))
+    
+    def test_kernel_errors(self):
+        """Test a failing kernel raises in every caller of the batch."""
+        def kernel(key, values):
+            raise ValueError('bad batch')
+        
+        batcher = MicroBatcher(kernel, window=0.001, max_size=8)
+        with self.assertRaisesRegex(ValueError, 'bad batch'):
+            batcher.submit('energy', 1.0)
+
+
+class TestTofConverter(unittest.TestCase):
+    """Unit tests for the TofConverter class."""
+    
+    def setUp(self):
+        """Set up a converter with three pixels."""
+        self.flight_paths = np.array([10.0, 11.0, 12.0])  # m
+        self.converter = TofConverter(self.flight_paths)
+    
+    def test_wavelength(self):
+        """Test event wavelengths match the velocity-based conversion."""
+        pixel_ids = np.array([2, 0, 1, 2])
+        tof = np.array([5000.0, 5000.0, 8000.0, 10000.0])  # µs
+        velocities = self.flight_paths[pixel_ids] / (tof * 1e-6)
+        np.testing.assert_allclose(
+            self.converter.wavelength(pixel_ids, tof),
+            NeutronConverter.velocity_to_wavelength(velocities), rtol=1e-14)
+        np.testing.assert_allclose(self.converter.velocity(pixel_ids, tof), velocities, rtol=1e-14)
+        np.testing.assert_allclose(
+            self.converter.energy(pixel_ids, tof),
+            NeutronConverter.velocity_to_energy(velocities), rtol=1e-14)
+    
+    def test_out_buffer(self):
+        """Test events are converted into a preallocated buffer."""
+        out = np.empty(2)
+        result = self.converter.energy([0, 1], [5000.0, 5000.0], out=out)
+        self.assertIs(result, out)
+    
+    def test_from_file(self):
+        """Test loading a two-column pixel id / flight path table."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'paths.csv')
+            with open(path, 'w') as f:
+                f.write('0,10.0\n2,12.0\n')
+            converter = TofConverter.from_file(path)
+        self.assertEqual(converter.pixel_count, 3)
+        self.assertTrue(np.isnan(converter.wavelength([1], [5000.0])[0]))
+    
+    def test_invalid_pixel_ids(self):
+        """Test pixel ids outside the table are rejected rather than wrapped around."""
+        for pixel_ids in ([-1], [0, 3]):
+            with self.assertRaises(IndexError):
+                self.converter.wavelength(pixel_ids, [5000.0] * len(pixel_ids))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'paths.csv')
+            for table in ('-1,10.0\n2,12.0\n', '0.5,10.0\n'):
+                with open(path, 'w') as f:
+                    f.write(table)
+                with self.assertRaisesRegex(ValueError, 'non-negative integers'):
+                    TofConverter.from_file(path)
+
+
+class TestConvertFile(unittest.TestCase):
+    """Unit tests for chunked file conversion."""
+    
+    def setUp(self):
+        """Set up a temporary directory."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+    
+    def test_convert_npy(self):
+        """Test an .npy file is converted across several chunks."""
+        energies = np.linspace(1, 100, 1001)
+        path = os.path.join(self.tmp.name, 'run.npy')
+        np.save(path, energies)
+        outputs = convert_file(path, 'energy', chunk_size=100)
+        self.assertEqual([os.path.basename(p) for p in outputs],
+                         ['run_energy_meV.npy', 'run_velocity_ms.npy', 'run_wavelength_angstrom.npy'])
+        np.testing.assert_array_equal(np.load(outputs[0]), energies)
+        np.testing.assert_allclose(np.load(outputs[2]), NeutronConverter.energy_to_wavelength(energies), rtol=1e-15)
+    
+    def test_convert_raw(self):
+        """Test a raw float64 file through the command-line entry point."""
+        path = os.path.join(self.tmp.name, 'run.f8')
+        np.array([1.8064, 4.0]).tofile(path)
+        self.assertEqual(main(['convert', '--quantity', 'wavelength', path]), 0)
+        energies = np.fromfile(os.path.join(self.tmp.name, 'run_energy_meV.f8'))
+        self.assertAlmostEqual(energies[0], 25.07, places=1)
+    
+    def test_convert_invalid(self):
+        """Test invalid input values are reported with their index."""
+        path = os.path.join(self.tmp.name, 'bad.npy')
+        np.save(path, np.array([1.0, 2.0, -1.0]))
+        with self.assertRaisesRegex(ValueError, 'element 2'):
+            convert_file(path, 'energy', chunk_size=2)
+        np.save(path, np.array([1.0, np.nan]))
+        with self.assertRaisesRegex(ValueError, 'Energy must be finite \\(element 1\\)'):
+            convert_file(path, 'energy')
+    
+    def test_convert_csv(self):
+        """Test CSV rows are converted across worker processes and written in order."""
+        path = os.path.join(self.tmp.name, 'scan.csv')
+        energies = np.linspace(1, 100, 500)
+        with open(path, 'w') as f:
+            f.write('run,energy,monitor\n')
+            f.writelines(f'{i},{energy!r},7\n' for i, energy in enumerate(energies.tolist()))
+        output_path, rows = convert_csv(path, 'energy', workers=2, chunk_bytes=512)
+        self.assertEqual((os.path.basename(output_path), rows), ('scan_converted.csv', 500))
+        with open(output_path) as f:
+            header = f.readline().strip().split(',')
+            table = np.loadtxt(f, delimiter=',')
+        self.assertEqual(header[3:], ['energy_meV', 'velocity_ms', 'wavelength_angstrom'])
+        np.testing.assert_array_equal(table[:, 0], np.arange(500))
+        np.testing.assert_array_equal(table[:, 3], energies)
+        np.testing.assert_array_equal(table[:, 5], NeutronConverter.convert_all('energy', energies)[2])
+    
+    def test_convert_csv_text(self):
+        """Test a headerless whitespace-delimited file through the command-line entry point."""
+        path = os.path.join(self.tmp.name, 'scan.txt')
+        with open(path, 'w') as f:
+            f.write('1  1.8064\n\n2  4.0\n')
+        self.assertEqual(main(['convert-csv', '-q', 'wavelength', '--no-header', '-c', '1',
+                               '-d', 'whitespace', '-j', '1', path]), 0)
+        with open(os.path.join(self.tmp.name, 'scan_converted.txt')) as f:
+            rows = [line.split() for line in f]
+        self.assertEqual(len(rows), 2)
+        self.assertAlmostEqual(float(rows[0][2]), 25.07, places=1)
+    
+    def test_convert_csv_invalid(self):
+        """Test invalid CSV values are reported with their line number."""
+        path = os.path.join(self.tmp.name, 'bad.csv')
+        with open(path, 'w') as f:
+            f.write('energy\n1\n2\nabc\n')
+        with self.assertRaisesRegex(ValueError, "Line 4: 'abc' is not a number"):
+            convert_csv(path, 'energy', workers=1)
+        with self.assertRaisesRegex(ValueError, 'no column named'):
+            convert_csv(path, 'wavelength', workers=1)
+    
+    def test_convert_csv_number_format(self):
+        """Test converted CSV values are spelled as repr spells them, with or without orjson."""
+        import neutron
+        
+        results = np.array([[1e-05, 1e16, 2.5e-07], [2.0, 0.00012, np.inf], [-1e-9, 1.5e300, 0.1],
+                            [10.00001, 100.00002, 3.00001e-05]])
+        expected = ['1e-05;1e+16;2.5e-07', '2.0;0.00012;', '-1e-09;1.5e+300;0.1',
+                    '10.00001;100.00002;3.00001e-05']
+        self.assertEqual(neutron._format_rows(results, ';'), expected)
+        with unittest.mock.patch.object(neutron, 'orjson', None):
+            self.assertEqual(neutron._format_rows(results, ';'), expected)
+
+
+class TestServerOptions(unittest.TestCase):
+    """Unit tests for the production server settings."""
+    
+    def test_defaults(self):
+        """Test the defaults select a threaded worker per CPU."""
+        args = argparse.Namespace(pid=None, **SERVER_DEFAULTS)
+        options = server_options(args)
+        self.assertEqual(options['workers'], SERVER_DEFAULTS['workers'])
+        self.assertEqual(options['worker_class'], 'gthread')
+        self.assertNotIn('pidfile', options)
+    
+    def test_single_threaded(self):
+        """Test a single thread per worker selects the sync worker."""
+        args = argparse.Namespace(**{**SERVER_DEFAULTS, 'threads': 1, 'pid': 'app.pid'})
+        options = server_options(args)
+        self.assertEqual(options['worker_class'], 'sync')
+        self.assertEqual(options['pidfile'], 'app.pid')
+
+
+class TestAppFactory(unittest.TestCase):
+    """Unit tests for create_app and the import layout."""
+    
+    def test_config(self):
+        """Test each app gets its own settings, overriding the environment."""
+        rounded = create_app({'JSON_FLOAT_DIGITS': 3})
+        self.assertEqual(rounded.config['JSON_FLOAT_DIGITS'], 3)
+        self.assertIsNot(rounded, app)
+        response = rounded.test_client().post('/convert/full', json={'energy': 25})
+        self.assertEqual(response.json['velocity_ms'], 2190)
+        response = app.test_client().post('/convert/full', json={'energy': 25})
+        self.assertAlmostEqual(response.json['velocity_ms'], 2186.967, places=3)
+    
+    def test_shim(self):
+        """Test names of neutron.py and web.py can still be imported from app."""
+        import neutron
+        import web
+        
+        self.assertIs(app_module.NeutronConverter, neutron.NeutronConverter)
+        self.assertIs(app_module.create_app, web.create_app)
+        self.assertIs(app_module.app, app)
+        with self.assertRaises(AttributeError):
+            app_module.no_such_name
+    
+    def test_kernels_without_flask(self):
+        """Test the kernels, rebinning and the app shim import without Flask or prometheus_client."""
+        code = ('import sys, app, neutron, rebin; app.NeutronConverter.convert_all("energy", 25.0); '
+                'print(sorted({"flask", "prometheus_client", "web"} & set(sys.modules)))')
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        self.assertEqual(output.strip(), '[]')
 
 
 class TestFlaskAPI(unittest.TestCase):
@@ -66,6 +508,45 @@ class TestFlaskAPI(unittest.TestCase):
         app.config['TESTING'] = True
         self.client = app.test_client()
     
+    def test_dashboard(self):
+        """Test the prebuilt dashboard is compressed and revalidated by ETag."""
+        response = self.client.get('/', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        page = gzip.decompress(response.data).decode()
+        self.assertIn('Neutron Converter', page)
+        # Checking against the server as the user types is opt-in
+        self.assertNotIn('checked', re.search(r'<input[^>]*id="liveCheck"[^>]*>', page).group())
+        
+        response = self.client.get('/', headers={'Accept-Encoding': 'gzip',
+                                                  'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+        
+        response = self.client.get('/', headers={'Accept-Encoding': 'identity'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.get_data(as_text=True), page)
+    
+    def test_dashboard_assets(self):
+        """Test dashboard assets are served from immutable content-addressed URLs."""
+        page = self.client.get('/').get_data(as_text=True)
+        for url in re.findall(r'(?:href|src)="(/assets/[^"]+)"', page):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertIn('immutable', response.headers['Cache-Control'])
+        self.assertEqual(self.client.get('/assets/missing.js').status_code, 404)
+    
+    def test_dashboard_script_constants(self):
+        """Test the dashboard script carries the server's conversion constants."""
+        page = self.client.get('/').get_data(as_text=True)
+        url = re.search(r'src="(/assets/[^"]+\.js)"', page).group(1)
+        script = self.client.get(url).get_data(as_text=True)
+        constants = json.loads(re.search(r'const CONSTANTS = (\{.*?\});', script).group(1))
+        self.assertEqual(constants['WAVELENGTH_SQRT_ENERGY'], app_module.WAVELENGTH_SQRT_ENERGY)
+        self.assertEqual(constants['VELOCITY_PER_SQRT_MEV'], app_module.VELOCITY_PER_SQRT_MEV)
+        self.assertIn('energy_meV', script)
+        self.assertNotIn('energy_eV', script)
+    
     def test_health_endpoint(self):
         """Test health check endpoint."""
         response = self.client.get('/health')
@@ -73,6 +554,44 @@ class TestFlaskAPI(unittest.TestCase):
         data = json.loads(response.data)
         self.assertEqual(data['status'], 'healthy')
     
+    def test_metrics_endpoint(self):
+        """Test request metrics are exposed in Prometheus text format."""
+        self.client.post('/convert/full', json={'energy': 25})
+        self.client.post('/convert/batch', json={'wavelength': [1.0, 2.0, 3.0]})
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        text = response.get_data(as_text=True)
+        self.assertRegex(text, r'neutron_requests_total\{method="POST",route="/convert/full",status="200"\} [1-9]')
+        self.assertIn('neutron_request_duration_seconds_bucket{le="0.001",route="/convert/full"}', text)
+        for phase in ('decode', 'convert', 'encode'):
+            self.assertIn(f'neutron_request_phase_seconds_total{{phase="{phase}",route="/convert/batch"}}', text)
+        self.assertIn('neutron_request_elements_bucket{le="10.0",route="/convert/batch"}', text)
+    
+    def test_profiling_signed_header(self):
+        """Test a request with a signed X-Profile header is profiled."""
+        app.config['PROFILE_SECRET'] = 'secret'
+        self.addCleanup(app.config.__setitem__, 'PROFILE_SECRET', None)
+        response = self.client.post('/convert/full', json={'energy': 25},
+                                    headers={'X-Profile': profile_token('secret')})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers['X-Profile-Summary'].startswith('total='))
+        
+        for token in (profile_token('wrong'), profile_token('secret', ttl=-10), 'garbage'):
+            response = self.client.post('/convert/full', json={'energy': 25}, headers={'X-Profile': token})
+            self.assertNotIn('X-Profile-Summary', response.headers)
+    
+    def test_profiling_sampled(self):
+        """Test sampled requests write their profile to the profile directory."""
+        with tempfile.TemporaryDirectory() as tmp:
+            app.config.update(PROFILE_SAMPLE_RATE=1.0, PROFILE_DIR=tmp)
+            try:
+                response = self.client.get('/convert/full?energy=25')
+            finally:
+                app.config.update(PROFILE_SAMPLE_RATE=0.0, PROFILE_DIR=None)
+            self.assertEqual(os.listdir(tmp), [response.headers['X-Profile-File']])
+        self.assertNotIn('X-Profile-Summary', self.client.get('/health').headers)
+    
     def test_energy_to_velocity_endpoint(self):
         """Test energy to velocity endpoint."""
         response = self.client.post(
@@ -97,6 +616,26 @@ class TestFlaskAPI(unittest.TestCase):
         self.assertEqual(data['velocity_ms'], 2187.928)
         self.assertAlmostEqual(data['energy_meV'], 25, places=1)
     
+    def test_pairwise_new_quantities(self):
+        """Test the generic dispatcher serves every registered pair."""
+        response = self.client.post('/convert/energy-to-temperature', json={'energy': 25})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['energy_meV'], 25)
+        self.assertAlmostEqual(response.json['temperature_K'], 290.113, places=3)
+        
+        response = self.client.get('/convert/wavevector-to-tof_per_metre?wavevector=3.49')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ETag', response.headers)
+        self.assertAlmostEqual(response.json['tof_per_metre_us_m'], 455.0, places=0)
+        
+        # Zero is rejected where the target diverges
+        response = self.client.post('/convert/energy-to-wavelength', json={'energy': 0})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json['error'], 'Energy must be positive')
+        
+        for url in ('/convert/energy-to-energy', '/convert/mass-to-energy'):
+            self.assertEqual(self.client.post(url, json={'energy': 1}).status_code, 404, url)
+    
     def test_full_conversion_energy(self):
         """Test full conversion endpoint with energy."""
         response = self.client.post(
@@ -109,6 +648,7 @@ class TestFlaskAPI(unittest.TestCase):
         self.assertEqual(data['energy_meV'], 25)
         self.assertIn('velocity_ms', data)
         self.assertIn('wavelength_angstrom', data)
+        self.assertEqual(sorted(data), sorted(spec.field for spec in QUANTITIES.values()))
     
     def test_full_conversion_velocity(self):
         """Test full conversion endpoint with velocity."""
@@ -180,6 +720,594 @@ class TestFlaskAPI(unittest.TestCase):
         data = json.loads(response.data)
         self.assertIn('error', data)
     
+    def test_get_conversion_cacheable(self):
+        """Test GET conversions carry strong ETags and long-lived caching."""
+        response = self.client.get('/convert/full?energy=25')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['energy_meV'], 25)
+        self.assertAlmostEqual(response.json['velocity_ms'], 2186.967, places=1)
+        etag = response.headers['ETag']
+        self.assertFalse(etag.startswith('W/'))
+        self.assertIn('max-age=31536000', response.headers['Cache-Control'])
+        
+        # Equivalent spellings of the same value share the ETag
+        response = self.client.get('/convert/full?energy=2.5e1', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], etag)
+        
+        response = self.client.get('/convert/energy-to-wavelength?energy=25')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+    
+    def test_float_digits(self):
+        """Test response floats can be rounded per request or through the config."""
+        response = self.client.get('/convert/energy-to-wavelength?energy=25&digits=6')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['wavelength_angstrom'], 1.80891)
+        self.assertNotEqual(response.headers['ETag'],
+                            self.client.get('/convert/energy-to-wavelength?energy=25').headers['ETag'])
+        
+        response = self.client.post('/convert/batch?digits=3', json={'energy': [25, 0]})
+        self.assertEqual(response.json['velocity_ms'], [2190.0, 0.0])
+        self.assertEqual(response.json['wavelength_angstrom'], [1.81, None])
+        
+        app.config['JSON_FLOAT_DIGITS'] = 4
+        try:
+            response = self.client.post('/convert/full', json={'energy': 25})
+            self.assertEqual(response.json['velocity_ms'], 2187.0)
+        finally:
+            app.config['JSON_FLOAT_DIGITS'] = None
+        
+        for digits in ('0', '18', 'six'):
+            response = self.client.get(f'/convert/full?energy=25&digits={digits}')
+            self.assertEqual(response.status_code, 400, digits)
+    
+    def test_full_conversion_coalesced(self):
+        """Test /convert/full answers the same through the micro-batcher."""
+        expected = self.client.post('/convert/full', json={'wavelength': 1.8}).json
+        app.config['BATCH_WINDOW'] = 200e-6
+        try:
+            responses = []
+            
+            def post():
+                responses.append(app.test_client().post('/convert/full', json={'wavelength': 1.8}))
+            
+            threads = [threading.Thread(target=post) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(app_module.full_batcher(app).stats()['requests'], 8)
+        finally:
+            app.config['BATCH_WINDOW'] = 0.0
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json['wavelength_angstrom'], 1.8)
+            for field, value in expected.items():
+                self.assertAlmostEqual(response.json[field], value, delta=1e-14 * value)
+        self.assertIsNone(app_module.full_batcher(app))
+        self.assertIn('neutron_coalesced_batch_size_bucket', self.client.get('/metrics').get_data(as_text=True))
+    
+    def test_get_conversion_invalid(self):
+        """Test invalid GET conversions are not cached."""
+        for url in ('/convert/full?energy=abc', '/convert/full?energy=nan',
+                    '/convert/velocity-to-energy?velocity=-1'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 400, url)
+            self.assertNotIn('Cache-Control', response.headers)
+    
+    def test_batch_conversion_energy(self):
+        """Test batch endpoint with an array of energies."""
+        energies = [1, 25, 100]
+        response = self.client.post(
+            '/convert/batch',
+            data=json.dumps({'energy': energies}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(data['energy_meV'], energies)
+        for energy, velocity, wavelength in zip(energies, data['velocity_ms'], data['wavelength_angstrom']):
+            self.assertAlmostEqual(velocity, NeutronConverter.energy_to_velocity(energy), places=6)
+            self.assertAlmostEqual(wavelength, NeutronConverter.energy_to_wavelength(energy), places=9)
+    
+    def test_batch_conversion_wavelength(self):
+        """Test batch endpoint with an array of wavelengths."""
+        response = self.client.post(
+            '/convert/batch',
+            data=json.dumps({'wavelength': [1.8064, 4.0]}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertAlmostEqual(data['energy_meV'][0], 25.07, places=1)
+        self.assertAlmostEqual(data['velocity_ms'][1], NeutronConverter.wavelength_to_velocity(4.0), places=6)
+    
+    def test_batch_conversion_zero_velocity(self):
+        """Test batch endpoint maps an infinite wavelength to null."""
+        response = self.client.post(
+            '/convert/batch',
+            data=json.dumps({'velocity': [0, 2187.928]}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertIsNone(data['wavelength_angstrom'][0])
+        self.assertAlmostEqual(data['wavelength_angstrom'][1], 1.8064, places=2)
+    
+    def test_batch_conversion_invalid(self):
+        """Test batch endpoint validation errors."""
+        for payload in (
+            {'energy': [1, -0.1]},
+            {'wavelength': [0]},
+            {'energy': 25},
+            {'energy': ['a']},
+            {'energy': [1], 'velocity': [1]},
+        ):
+            response = self.client.post(
+                '/convert/batch',
+                data=json.dumps(payload),
+                content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 400, payload)
+            self.assertIn('error', json.loads(response.data))
+    
+    def test_non_numeric_inputs(self):
+        """Test strings, booleans and lists are rejected by every scalar route with 400."""
+        for value in ('25', True, [25], {'value': 25}):
+            for url in ('/convert/energy-to-wavelength', '/convert/full'):
+                response = self.client.post(url, json={'energy': value})
+                self.assertEqual(response.status_code, 400, (url, value))
+                self.assertEqual(response.json['error'], 'Energy must be a number')
+        response = self.client.post('/convert/stream', data='{"energy": false}\n', content_type='application/x-ndjson')
+        self.assertEqual(json.loads(response.data), {'error': 'Energy must be a number', 'line': 1})
+        for body in (b'[25]', b'{"energy": 25'):
+            response = self.client.post('/convert/full', data=body, content_type='application/json')
+            self.assertEqual(response.status_code, 400, body)
+    
+    def test_large_integer_inputs(self):
+        """Test integers beyond 64 bits are converted and echoed back by the scalar routes."""
+        body = json.dumps({'energy': 10**30})
+        for url in ('/convert/energy-to-velocity', '/convert/full'):
+            response = self.client.post(url, data=body, content_type='application/json')
+            self.assertEqual(response.status_code, 200, url)
+            self.assertEqual(response.json['energy_meV'], 10**30)
+            self.assertAlmostEqual(response.json['velocity_ms'] / 4.3739336e17, 1, places=6)
+        response = self.client.post('/convert/stream', data=f'{body}\n{body}\n', content_type='application/x-ndjson')
+        records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual([record['energy_meV'] for record in records], [10**30] * 2)
+    
+    def test_float_overflow_inputs(self):
+        """Test integers beyond the float range are rejected as not finite, by index in arrays."""
+        huge = 10**400
+        for url in ('/convert/energy-to-velocity', '/convert/full'):
+            response = self.client.post(url, data=json.dumps({'energy': -huge}), content_type='application/json')
+            self.assertEqual(response.status_code, 400, url)
+            self.assertEqual(response.json['error'], 'Energy must be finite')
+        body = json.dumps({'energy': [1, huge, 'x'], 'invalid': 'nan'})
+        response = self.client.post('/convert/batch', data=body, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['invalid'],
+                         {'index': [1, 2], 'error': ['Energy must be finite', 'Energy must be a number']})
+        body = json.dumps({'energy': [1, 2], 'uncertainty': [1, huge]})
+        response = self.client.post('/convert/batch', data=body, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/convert/stream', data=json.dumps({'energy': huge}) + '\n',
+                                    content_type='application/x-ndjson')
+        self.assertEqual(json.loads(response.data), {'error': 'Energy must be finite', 'line': 1})
+        self.assertEqual(validate_values('energy', [huge, 2.0])[1].tolist(), [2, 0])
+    
+    def test_divergent_scalar_results(self):
+        """Test zero energy and velocity give null divergent results on every scalar route."""
+        batched = create_app({'TESTING': True, 'BATCH_WINDOW': 0.0005}).test_client()
+        for body in ({'energy': 0}, {'velocity': 0}, {'temperature': 0}):
+            for client in (self.client, batched):
+                response = client.post('/convert/full', json=body)
+                self.assertEqual(response.status_code, 200, body)
+                self.assertIsNone(response.json['wavelength_angstrom'])
+                self.assertIsNone(response.json['tof_per_metre_us_m'])
+                self.assertEqual(response.json['energy_meV'], 0)
+        response = self.client.get('/convert/full?velocity=0')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json['wavelength_angstrom'])
+        response = self.client.post('/convert/full', json={'energy': 0, 'uncertainty': 0.1})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json['wavelength_angstrom_uncertainty'])
+        
+        body = '{"energy": 0}\n{"velocity": 0}\n'
+        response = self.client.post('/convert/stream', data=body, content_type='application/x-ndjson')
+        records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(records, [{'energy_meV': 0, 'velocity_ms': 0, 'wavelength_angstrom': None}] * 2)
+        response = self.client.post('/convert/live', data=body, content_type='application/x-ndjson')
+        events = response.get_data(as_text=True).split('\n\n')[:-1]
+        for event in events:
+            record = json.loads(event.removeprefix('data: '))
+            self.assertNotIn('error', record)
+            self.assertIsNone(record['wavelength_angstrom'])
+    
+    def test_batch_invalid_elements(self):
+        """Test invalid batch elements are reported by index, and rejected, dropped or NaN-filled."""
+        energies = [1, 'a', -1, True, 25]
+        response = self.client.post('/convert/batch', json={'energy': energies})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json['error'], 'Energy must be a number')
+        self.assertEqual(response.json['invalid'], {
+            'index': [1, 2, 3],
+            'error': ['Energy must be a number', 'Energy must be non-negative', 'Energy must be a number']
+        })
+        
+        response = self.client.post('/convert/batch', json={'energy': energies, 'invalid': 'drop'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['count'], 2)
+        self.assertEqual(response.json['energy_meV'], [1, 25])
+        self.assertEqual(response.json['invalid']['index'], [1, 2, 3])
+        
+        response = self.client.post('/convert/batch', json={'energy': energies, 'invalid': 'nan', 'uncertainty': 0.1})
+        self.assertEqual(response.json['count'], 5)
+        self.assertEqual(response.json['velocity_ms'][1:4], [None, None, None])
+        self.assertIsNone(response.json['velocity_ms_uncertainty'][2])
+        self.assertAlmostEqual(response.json['velocity_ms'][4], 2186.967, places=1)
+        
+        response = self.client.post('/convert/batch?quantity=wavelength&invalid=nan',
+                                    data=np.array([1.8, np.inf, 0.0]).tobytes(),
+                                    headers={'Content-Type': 'application/octet-stream',
+                                             'Accept': 'application/octet-stream'})
+        self.assertEqual(response.headers['X-Invalid-Count'], '2')
+        energy = np.frombuffer(response.data, '<f8').reshape(3, -1)[0]
+        self.assertEqual(np.isnan(energy).tolist(), [False, True, True])
+        
+        response = self.client.post('/convert/batch', json={'energy': [1], 'invalid': 'skip'})
+        self.assertEqual(response.status_code, 400)
+    
+    def test_batch_conversion_binary(self):
+        """Test batch endpoint with a raw float64 body and binary response."""
+        energies = np.array([1.0, 25.0, 100.0])
+        response = self.client.post(
+            '/convert/batch?quantity=energy',
+            data=energies.astype('<f8').tobytes(),
+            content_type='application/octet-stream',
+            headers={'Accept': 'application/octet-stream'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Quantities'], 'energy_meV,velocity_ms,wavelength_angstrom')
+        self.assertEqual(response.headers['X-Count'], '3')
+        results = np.frombuffer(response.data, dtype='<f8').reshape(3, -1)
+        np.testing.assert_array_equal(results[0], energies)
+        np.testing.assert_allclose(results[1], NeutronConverter.energy_to_velocity(energies), rtol=1e-15)
+    
+    def test_batch_conversion_npy(self):
+        """Test batch endpoint with .npy input and .npz output."""
+        buffer = io.BytesIO()
+        np.save(buffer, np.array([1.8064, 4.0]))
+        response = self.client.post(
+            '/convert/batch?quantity=wavelength',
+            data=buffer.getvalue(),
+            content_type='application/x-npy',
+            headers={'Accept': 'application/x-npz'}
+        )
+        self.assertEqual(response.status_code, 200)
+        with np.load(io.BytesIO(response.data)) as results:
+            self.assertAlmostEqual(results['energy_meV'][0], 25.07, places=1)
+            self.assertEqual(results['wavelength_angstrom'][1], 4.0)
+    
+    def test_uncertainty(self):
+        """Test scalar and batch routes return propagated uncertainties."""
+        response = self.client.get('/convert/full?wavelength=1.8&relative_uncertainty=0.01')
+        self.assertEqual(response.status_code, 200)
+        data = response.json
+        self.assertAlmostEqual(data['wavelength_angstrom_uncertainty'], 0.018, places=12)
+        self.assertAlmostEqual(data['energy_meV_uncertainty'] / data['energy_meV'], 0.02, places=12)
+        self.assertAlmostEqual(data['temperature_K_uncertainty'] / data['temperature_K'], 0.02, places=12)
+        
+        response = self.client.post('/convert/energy-to-velocity', json={'energy': 25, 'uncertainty': 0.5})
+        self.assertAlmostEqual(response.json['velocity_ms_uncertainty'] / response.json['velocity_ms'], 0.01, places=12)
+        self.assertEqual(response.json['energy_meV_uncertainty'], 0.5)
+        
+        response = self.client.post('/convert/batch', json={'energy': [0, 25], 'uncertainty': [0.1, 0.5]})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json['velocity_ms_uncertainty'][0])
+        self.assertAlmostEqual(response.json['wavelength_angstrom_uncertainty'][1], 0.01809, places=5)
+        
+        response = self.client.post('/convert/batch?quantity=energy&relative_uncertainty=0.02',
+                                    data=np.array([25.0]).tobytes(),
+                                    headers={'Content-Type': 'application/octet-stream',
+                                             'Accept': 'application/octet-stream'})
+        self.assertEqual(response.headers['X-Quantities'].split(',')[3:],
+                         ['energy_meV_uncertainty', 'velocity_ms_uncertainty', 'wavelength_angstrom_uncertainty'])
+        self.assertAlmostEqual(np.frombuffer(response.data, '<f8')[3], 0.5)
+        
+        for body in ({'energy': 1, 'uncertainty': -1}, {'energy': 1, 'uncertainty': 'x'},
+                     {'energy': 1, 'uncertainty': 0.1, 'relative_uncertainty': 0.1}):
+            self.assertEqual(self.client.post('/convert/full', json=body).status_code, 400, body)
+        response = self.client.post('/convert/batch', json={'energy': [1, 2], 'uncertainty': [1]})
+        self.assertEqual(response.status_code, 400)
+    
+    def test_batch_conversion_binary_invalid(self):
+        """Test batch endpoint rejects malformed binary bodies."""
+        for url, body in (
+            ('/convert/batch', np.ones(2).tobytes()),
+            ('/convert/batch?quantity=energy', b'1234'),
+            ('/convert/batch?quantity=energy', np.array([-1.0]).tobytes()),
+        ):
+            response = self.client.post(url, data=body, content_type='application/octet-stream')
+            self.assertEqual(response.status_code, 400, url)
+            self.assertIn('error', json.loads(response.data))
+    
+    def test_tof_conversion(self):
+        """Test TOF endpoint with packed binary events."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'paths.npy')
+            np.save(path, np.array([10.0, 12.0]))
+            app.config['TOF_FLIGHT_PATHS'] = path
+            events = np.zeros(2, dtype=[('pixel_id', '<u4'), ('tof', '<f8')])
+            events['pixel_id'] = [1, 0]
+            events['tof'] = [5000.0, 5000.0]
+            response = self.client.post(
+                '/convert/tof',
+                data=events.tobytes(),
+                content_type='application/octet-stream',
+                headers={'Accept': 'application/octet-stream'}
+            )
+            invalid = self.client.post('/convert/tof', json={'pixel_id': [2], 'tof': [5000.0]})
+            dropped = self.client.post('/convert/tof', json={'pixel_id': [0, 1, 0], 'tof': [5000.0, 0, '1'],
+                                                             'invalid': 'drop'})
+            coerced = self.client.post('/convert/tof', json={'pixel_id': [1.7, '1', True, 1.0, 0], 'tof': [5000.0] * 5})
+            filled = self.client.post('/convert/tof', content_type='application/json', data=json.dumps(
+                {'pixel_id': [1.5, 1, 10**30], 'tof': [5000.0] * 3, 'invalid': 'nan'}))
+            app.config['TOF_FLIGHT_PATHS'] = None
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Quantities'], 'wavelength_angstrom,energy_meV')
+        wavelength, energy = np.frombuffer(response.data, dtype='<f8').reshape(2, -1)
+        expected = NeutronConverter.velocity_to_wavelength(np.array([12.0, 10.0]) / 5e-3)
+        np.testing.assert_allclose(wavelength, expected, rtol=1e-14)
+        self.assertEqual(invalid.status_code, 400)
+        self.assertEqual(dropped.json['count'], 1)
+        self.assertEqual(dropped.json['invalid'], {
+            'index': [1, 2], 'error': ['Time of flight must be positive', 'Time of flight must be a number']
+        })
+        self.assertEqual(coerced.status_code, 400)
+        self.assertEqual(coerced.json['invalid'], {'index': [0, 1, 2], 'error': ['pixel_id must be an integer'] * 3})
+        self.assertEqual(filled.status_code, 200)
+        self.assertEqual(filled.json['invalid']['error'],
+                         ['pixel_id must be an integer', 'pixel_id must be between 0 and 1'])
+        self.assertEqual([value is None for value in filled.json['energy_meV']], [True, False, True])
+    
+    def test_table(self):
+        """Test table endpoint over a log grid."""
+        response = self.client.get('/convert/table?quantity=energy&start=0.1&stop=1000&count=5&spacing=log')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['count'], 5)
+        self.assertIsNone(data['next_offset'])
+        for expected, energy in zip([0.1, 1, 10, 100, 1000], data['energy_meV']):
+            self.assertAlmostEqual(energy, expected, places=9)
+        self.assertAlmostEqual(data['wavelength_angstrom'][2], NeutronConverter.energy_to_wavelength(10), places=9)
+        
+        response = self.client.get(
+            '/convert/table?quantity=energy&start=0.1&stop=1000&count=5&spacing=log',
+            headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+    
+    def test_table_pagination(self):
+        """Test table pages and NDJSON streaming."""
+        url = '/convert/table?quantity=wavelength&start=1&stop=10&count=25'
+        data = json.loads(self.client.get(url + '&offset=10&limit=10').data)
+        self.assertEqual(data['next_offset'], 20)
+        self.assertEqual(len(data['energy_meV']), 10)
+        self.assertAlmostEqual(data['wavelength_angstrom'][0], 1 + 9 * 10 / 24, places=9)
+        
+        response = self.client.get(url, headers={'Accept': 'application/x-ndjson'})
+        records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(len(records), 25)
+        self.assertEqual(records[-1]['wavelength_angstrom'], 10)
+    
+    def test_table_invalid(self):
+        """Test table endpoint validation errors."""
+        for query in ('quantity=energy&start=-1&stop=10&count=5',
+                      'quantity=energy&start=0&stop=10&count=5&spacing=log',
+                      'quantity=energy&start=1&stop=10&count=0',
+                      'quantity=mass&start=1&stop=10&count=5',
+                      'quantity=energy&start=1&stop=10'):
+            response = self.client.get('/convert/table?' + query)
+            self.assertEqual(response.status_code, 400, query)
+    
+    def test_stream_conversion(self):
+        """Test NDJSON streaming endpoint converts each line."""
+        body = '{"energy": 25}\n\n{"wavelength": 1.8064}\n{"energy": -1}\nnot json\n'
+        response = self.client.post(
+            '/convert/stream',
+            data=body,
+            content_type='application/x-ndjson'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(len(records), 4)
+        self.assertEqual(records[0]['energy_meV'], 25)
+        self.assertAlmostEqual(records[0]['velocity_ms'], 2186.967, places=1)
+        self.assertAlmostEqual(records[1]['energy_meV'], 25.07, places=1)
+        self.assertEqual(records[2], {'error': 'Energy must be non-negative', 'line': 4})
+        self.assertEqual(records[3]['line'], 5)
+    
+    def test_compressed_responses(self):
+        """Test large responses are compressed in the best coding the client accepts."""
+        energies = np.linspace(1, 100, 500).tolist()
+        expected = json.loads(self.client.post('/convert/batch', json={'energy': energies}).data)
+        codings = {'gzip': gzip.decompress}
+        if app_module.brotli is not None:
+            codings['br'] = app_module.brotli.decompress
+        if app_module.zstandard is not None:
+            codings['zstd'] = lambda data: app_module.zstandard.ZstdDecompressor().decompressobj().decompress(data)
+        for coding, decompress in codings.items():
+            response = self.client.post('/convert/batch', json={'energy': energies},
+                                        headers={'Accept-Encoding': f'{coding}, identity;q=0.5'})
+            self.assertEqual(response.headers['Content-Encoding'], coding)
+            self.assertIn('Accept-Encoding', response.headers['Vary'])
+            self.assertEqual(json.loads(decompress(response.data)), expected)
+        
+        response = self.client.post('/convert/full', json={'energy': 25}, headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        
+        response = self.client.get('/convert/table?quantity=wavelength&start=1&stop=10&count=2000',
+                                   headers={'Accept': 'application/x-ndjson', 'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', response.headers)
+        records = [json.loads(line) for line in gzip.decompress(response.data).decode().splitlines()]
+        self.assertEqual(len(records), 2000)
+        self.assertEqual(records[-1]['wavelength_angstrom'], 10)
+    
+    def test_compression_config(self):
+        """Test COMPRESS_LEVEL=0 turns compression off and compressed ETags are weak."""
+        test_app = create_app({'TESTING': True, 'COMPRESS_LEVEL': 0})
+        response = test_app.test_client().post('/convert/batch', json={'energy': list(range(1, 500))},
+                                               headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        
+        url = '/convert/table?quantity=energy&start=0.1&stop=1000&count=200'
+        response = self.client.get(url, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertTrue(response.headers['ETag'].startswith('W/'))
+        response = self.client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+        self.assertTrue(response.headers['ETag'].startswith('W/'))
+    
+    def test_compressed_requests(self):
+        """Test request bodies sent with a Content-Encoding are decompressed."""
+        body = json.dumps({'energy': [25, 80]}).encode()
+        response = self.client.post('/convert/batch', data=gzip.compress(body),
+                                    content_type='application/json', headers={'Content-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertAlmostEqual(json.loads(response.data)['velocity_ms'][0], 2186.967, places=1)
+        
+        lines = ''.join(json.dumps({'energy': energy}) + '\n' for energy in range(1, 3001)).encode()
+        response = self.client.post('/convert/stream', data=gzip.compress(lines),
+                                    content_type='application/x-ndjson', headers={'Content-Encoding': 'gzip'})
+        records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual([record['energy_meV'] for record in records], list(range(1, 3001)))
+        
+        if app_module.zstandard is not None:
+            response = self.client.post('/convert/batch', data=app_module.zstandard.ZstdCompressor().compress(body),
+                                        content_type='application/json', headers={'Content-Encoding': 'zstd'})
+            self.assertEqual(response.status_code, 200)
+        
+        for url, content_type in (('/convert/batch', 'application/json'), ('/convert/full', 'application/json'),
+                                  ('/convert/stream', 'application/x-ndjson')):
+            response = self.client.post(url, data=b'not gzip', content_type=content_type,
+                                        headers={'Content-Encoding': 'gzip'})
+            self.assertEqual(response.status_code, 400, url)
+            self.assertEqual(response.json, {'error': 'Invalid gzip request body'})
+        
+        # A body cut off after the first lines ends the stream with an error record
+        many = ''.join(json.dumps({'energy': energy}) + '\n' for energy in range(1, 30001)).encode()
+        truncated = gzip.compress(many)[:-1000]
+        response = self.client.post('/convert/stream', data=truncated, content_type='application/x-ndjson',
+                                    headers={'Content-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 200)
+        records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(records[-1]['error'], 'Invalid gzip request body')
+        self.assertIn('energy_meV', records[0])
+        response = self.client.post('/convert/batch', data=body, content_type='application/json',
+                                    headers={'Content-Encoding': 'compress'})
+        self.assertEqual(response.status_code, 415)
+        self.assertIn('gzip', json.loads(response.data)['error'])
+    
+    def test_compressed_request_size_limit(self):
+        """Test bodies that decompress to more than MAX_DECODED_BYTES are refused with 413."""
+        client = create_app({'TESTING': True, 'MAX_DECODED_BYTES': 100_000}).test_client()
+        encoders = {'gzip': gzip.compress}
+        if app_module.brotli is not None and hasattr(app_module.brotli.Decompressor, 'can_accept_more_data'):
+            encoders['br'] = app_module.brotli.compress
+        if app_module.zstandard is not None:
+            encoders['zstd'] = app_module.zstandard.ZstdCompressor().compress
+        body = b'{"energy": [' + b'1,' * 60_000 + b'1]}'
+        for encoding, compress in encoders.items():
+            bomb = compress(body)
+            response = client.post('/convert/batch', data=bomb, content_type='application/json',
+                                   headers={'Content-Encoding': encoding})
+            self.assertEqual(response.status_code, 413, encoding)
+            self.assertEqual(response.json, {'error': 'Decompressed request body is larger than 100000 bytes'})
+            self.assertEqual(self.client.post('/convert/batch', data=bomb, content_type='application/json',
+                                              headers={'Content-Encoding': encoding}).status_code, 200)
+        
+        lines = b'{"energy": 25}\n' * 10_000
+        response = client.post('/convert/stream', data=gzip.compress(lines), content_type='application/x-ndjson',
+                               headers={'Content-Encoding': 'gzip'})
+        records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(records[-1]['error'], 'Decompressed request body is larger than 100000 bytes')
+        self.assertIn('energy_meV', records[0])
+    
+    def test_live_event_stream(self):
+        """Test the live channel answers NDJSON lines with one event each."""
+        body = '{"energy": 25, "id": 7}\n\n{"wavelength": "1.8"}\n[1]\n{"velocity": 2000, "energy": 1}\n'
+        response = self.client.post('/convert/live', data=body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertTrue(response.cache_control.no_cache)
+        events = response.get_data(as_text=True).split('\n\n')
+        self.assertEqual(events.pop(), '')
+        records = [json.loads(event.removeprefix('data: ')) for event in events]
+        self.assertEqual(len(records), 4)
+        self.assertEqual(records[0]['id'], 7)
+        self.assertEqual(records[0]['energy_meV'], 25)
+        self.assertEqual(set(records[0]) - {'id'}, {spec.field for spec in QUANTITIES.values()})
+        self.assertEqual(records[1], {'error': 'Wavelength must be a number'})
+        self.assertEqual(records[2], {'error': 'Each message must be a JSON object'})
+        self.assertIn('exactly one parameter', records[3]['error'])
+    
+    @unittest.skipIf(importlib.util.find_spec('simple_websocket') is None, 'simple-websocket is not installed')
+    def test_live_websocket(self):
+        """Test the live channel converts every WebSocket message over one connection."""
+        import simple_websocket
+        
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            ws = simple_websocket.Client(f'ws://127.0.0.1:{server.server_port}/convert/live')
+            try:
+                for number, energy in enumerate([25, 80, 3.5]):
+                    ws.send(json.dumps({'energy': energy, 'id': number}))
+                    record = json.loads(ws.receive(timeout=5))
+                    self.assertEqual(record['id'], number)
+                    self.assertAlmostEqual(record['wavelength_angstrom'],
+                                           NeutronConverter.energy_to_wavelength(energy), places=12)
+                ws.send('{"energy": -1}')
+                self.assertEqual(json.loads(ws.receive(timeout=5)), {'error': 'Energy must be non-negative'})
+            finally:
+                ws.close()
+        finally:
+            server.shutdown()
+    
+    @unittest.skipIf(importlib.util.find_spec('simple_websocket') is None, 'simple-websocket is not installed')
+    def test_live_websocket_limit(self):
+        """Test each process holds at most LIVE_MAX_SOCKETS WebSockets and refuses more with 503."""
+        import simple_websocket
+        
+        limited = create_app({'TESTING': True, 'LIVE_MAX_SOCKETS': 1})
+        server = make_server('127.0.0.1', 0, limited, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f'ws://127.0.0.1:{server.server_port}/convert/live'
+        try:
+            ws = simple_websocket.Client(url)
+            try:
+                ws.send('{"energy": 25}')
+                self.assertIn('wavelength_angstrom', json.loads(ws.receive(timeout=5)))
+                with self.assertRaises(simple_websocket.ConnectionError):
+                    simple_websocket.Client(url)
+            finally:
+                ws.close()
+            # The slot is released once the server sees the close
+            for _ in range(50):
+                try:
+                    simple_websocket.Client(url).close()
+                    break
+                except simple_websocket.ConnectionError:
+                    time.sleep(0.1)
+            else:
+                self.fail('The WebSocket slot was not released')
+        finally:
+            server.shutdown()
+    
     def test_not_found(self):
         """Test 404 error handling."""
         response = self.client.get('/nonexistent')
@@ -0,0 +1,37 @@
+import json
+import os
+import tempfile
+import unittest
+
+import bench
+
+
+class TestBenchmarks(unittest.TestCase):
+    """Unit tests for the benchmark suite."""
+    
+    def test_run(self):
+        """Test a selected benchmark reports a positive throughput."""
+        results = bench.run(['scalar.convert_all'], min_time=0.01, repeat=1)
+        self.assertEqual(list(results), ['scalar.convert_all'])
+        self.assertGreater(results['scalar.convert_all'], 0)
+    
+    def test_compare(self):
+        """Test only drops beyond the threshold are reported as regressions."""
+        baseline = {'a': 1000.0, 'b': 1000.0, 'c': 1000.0}
+        results = {'a': 900.0, 'b': 700.0, 'c': 1500.0, 'd': 1.0}
+        regressions = bench.compare(baseline, results, threshold=0.15)
+        self.assertEqual([name for name, *_ in regressions], ['b'])
+        self.assertAlmostEqual(regressions[0][3], -0.3)
+    
+    def test_main_fails_on_regression(self):
+        """Test the command exits non-zero against an unreachable baseline."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'baseline.json')
+            with open(path, 'w') as f:
+                json.dump({'scalar.convert_all': 1e15}, f)
+            self.assertEqual(
+                bench.main(['scalar.convert_all', '--compare', path, '--min-time', '0.01', '--repeat', '1']), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+
+import numpy as np
+
+from neutron import NeutronConverter
+from rebin import convert_axis, rebin, rebin_histogram
+
+
+def _reference_rebin(counts, edges, target_edges):
+    """Rebin one ascending spectrum with a Python loop over bin overlaps."""
+    result = np.zeros(len(target_edges) - 1)
+    for i in range(len(counts)):
+        for j in range(len(result)):
+            overlap = min(edges[i + 1], target_edges[j + 1]) - max(edges[i], target_edges[j])
+            if overlap > 0:
+                result[j] += counts[i] * overlap / (edges[i + 1] - edges[i])
+    return result
+
+
+class TestRebin(unittest.TestCase):
+    """Unit tests for count-conserving rebinning."""
+    
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.counts = rng.poisson(100, (4, 50)).astype(np.float64)
+        self.tof_edges = np.linspace(2000, 20000, 51)
+        self.flight_paths = np.array([10.0, 11.0, 12.5, 15.0])
+    
+    def test_rebin_same_axis(self):
+        """Test overlap rebinning matches a loop reference and conserves counts."""
+        edges = np.array([0.0, 1.0, 2.0, 4.0, 7.0])
+        counts = np.array([1.0, 2.0, 4.0, 3.0])
+        target = np.array([-1.0, 0.5, 3.0, 3.5, 8.0])
+        np.testing.assert_allclose(rebin(counts, edges, target), _reference_rebin(counts, edges, target))
+        np.testing.assert_allclose(rebin(counts, edges, target[::-1]), _reference_rebin(counts, edges, target)[::-1])
+        np.testing.assert_allclose(rebin(counts, edges, edges), counts)
+        self.assertAlmostEqual(rebin(counts, edges, target).sum(), counts.sum())
+    
+    def test_rebin_rows(self):
+        """Test per-spectrum edges give the same result as rebinning each spectrum alone."""
+        edges = np.sort(np.random.default_rng(1).uniform(0, 10, (4, 51)), axis=1)
+        target = np.linspace(0, 10, 23)
+        result = rebin(self.counts, edges, target)
+        for row in range(4):
+            np.testing.assert_allclose(result[row], rebin(self.counts[row], edges[row], target))
+            np.testing.assert_allclose(result[row], _reference_rebin(self.counts[row], edges[row], target))
+    
+    def test_convert_axis(self):
+        """Test TOF edges convert with one flight path per spectrum."""
+        wavelengths = convert_axis('tof', 'wavelength', self.tof_edges, self.flight_paths)
+        self.assertEqual(wavelengths.shape, (4, 51))
+        velocity = self.flight_paths[2] / (self.tof_edges[7] * 1e-6)
+        self.assertAlmostEqual(wavelengths[2, 7], NeutronConverter.velocity_to_wavelength(velocity), places=12)
+        np.testing.assert_allclose(convert_axis('wavelength', 'tof', wavelengths, self.flight_paths),
+                                   np.broadcast_to(self.tof_edges, (4, 51)))
+        with self.assertRaises(ValueError):
+            convert_axis('tof', 'energy', self.tof_edges)
+    
+    def test_edges_only(self):
+        """Test converting edges alone keeps every bin's counts, reordered to ascending edges."""
+        edges, counts = rebin_histogram(self.counts, self.tof_edges, 'tof', 'energy', flight_paths=self.flight_paths)
+        self.assertTrue((np.diff(edges, axis=-1) > 0).all())
+        np.testing.assert_array_equal(counts, self.counts[:, ::-1])
+    
+    def test_rebin_tof_to_energy(self):
+        """Test rebinning onto an energy grid conserves counts within the covered range."""
+        grid = np.geomspace(0.5, 200, 81)
+        result = rebin_histogram(self.counts, self.tof_edges, 'tof', 'energy', grid, flight_paths=self.flight_paths)
+        self.assertEqual(result.shape, (4, 80))
+        for row, flight_path in enumerate(self.flight_paths):
+            source = convert_axis('energy', 'tof', grid, flight_path)[::-1]
+            np.testing.assert_allclose(result[row], _reference_rebin(self.counts[row], self.tof_edges, source)[::-1])
+        
+        # A grid covering the whole spectrum keeps every count
+        energies = convert_axis('tof', 'energy', self.tof_edges[[0, -1]], self.flight_paths)
+        grid = np.geomspace(energies.min() * 0.99, energies.max() * 1.01, 200)
+        result = rebin_histogram(self.counts, self.tof_edges, 'tof', 'energy', grid, flight_paths=self.flight_paths)
+        np.testing.assert_allclose(result.sum(axis=1), self.counts.sum(axis=1))
+    
+    def test_density(self):
+        """Test densities pick up the Jacobian of the mapping."""
+        wavelength_edges = np.linspace(1.0, 5.0, 101)
+        density = np.ones(100)  # flat in wavelength
+        edges, energy_density = rebin_histogram(density, wavelength_edges, 'wavelength', 'energy', density=True)
+        # dN/dE = dN/dλ · |dλ/dE|, and |dλ/dE| = λ / (2E)
+        centres = 0.5 * (edges[1:] + edges[:-1])
+        expected = NeutronConverter.convert('energy', 'wavelength', centres) / (2 * centres)
+        np.testing.assert_allclose(energy_density, expected, rtol=1e-3)
+        self.assertAlmostEqual((energy_density * np.diff(edges)).sum(), 4.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,2366 @@
+"""
+Flask web application for the neutron converter.
+
+create_app() builds an app serving the conversion routes, the dashboard
+and the Prometheus metrics. The conversions themselves live in neutron.py.
+The dashboard is rendered and compressed on its first request, and
+prometheus_client is imported when the first metric is recorded, so
+creating an app for a test or a command is cheap.
+"""
+
+from flask import (Blueprint, Flask, Request, Response, abort, current_app, g, has_request_context, make_response,
+                   request, jsonify, stream_with_context)
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.exceptions import BadRequest, HTTPException, RequestEntityTooLarge
+from werkzeug.wsgi import get_input_stream
+import collections
+import contextlib
+import cProfile
+import functools
+import gzip
+import hashlib
+import hmac
+import io
+import itertools
+import json
+import math
+import os
+import pstats
+import queue
+import random
+import threading
+import time
+import zlib
+import numpy as np
+
+import neutron
+from neutron import (BATCH_OUTPUT_FIELDS, BATCH_OUTPUT_QUANTITIES, MEV_TO_JOULES, NEUTRON_MASS, NOT_A_NUMBER,
+                     OUT_OF_RANGE, PLANCK_CONSTANT, QUANTITIES, QUANTITY_CHOICES, VALIDATION_MESSAGES,
+                     VALIDATION_RULES, NeutronConverter, TofConverter, validate_values, validation_messages)
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; dashboard assets are then served gzip-compressed only
+    brotli = None
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; responses are then encoded with the stdlib json module
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional; responses are then compressed with brotli or gzip only
+    zstandard = None
+
+api = Blueprint('neutron', __name__)
+
+# Optional standard uncertainty of the input, absolute (input units) or relative to the value:
+# parameter -> label used in error messages
+UNCERTAINTY_PARAMETERS = {
+    'uncertainty': 'Uncertainty',
+    'relative_uncertainty': 'Relative uncertainty',
+}
+
+# How the array routes handle invalid input elements: reject the request, drop the elements,
+# or convert them to NaN (null in JSON) so that results stay aligned with the input
+INVALID_POLICIES = ('reject', 'drop', 'nan')
+
+# Validation messages for the times of flight of /convert/tof, indexed by validation code
+TOF_VALIDATION_MESSAGES = validation_messages('Time of flight', False)
+
+# Binary media types accepted and produced by /convert/batch
+NPY_MIMETYPE = 'application/x-npy'
+NPZ_MIMETYPE = 'application/x-npz'
+RAW_MIMETYPE = 'application/octet-stream'
+TOF_OUTPUT_FIELDS = ('wavelength_angstrom', 'energy_meV')
+
+# Packed event record accepted by /convert/tof as application/octet-stream
+TOF_EVENT_DTYPE = np.dtype([('pixel_id', '<u4'), ('tof', '<f8')])
+
+# Largest number of significant digits a response can be rounded to; 17 always round-trips a float64
+MAX_FLOAT_DIGITS = 17
+
+# Lifetime of cached GET conversion responses; results are pure functions of the input
+CONVERSION_CACHE_MAX_AGE = 365 * 24 * 3600  # seconds
+
+# Conversion tables: largest grid, default page size and number of grids kept in the LRU cache
+TABLE_MAX_COUNT = 100_000
+TABLE_PAGE_SIZE = 1000
+TABLE_CACHE_SIZE = 32
+TABLE_SPACINGS = ('linear', 'log')
+
+# Response compression: content codings in order of preference with their default and
+# largest levels, the codings available here, and bytes read at a time from a compressed
+# request body, which is also the most decompressed at a time
+COMPRESS_LEVELS = {'zstd': (1, 22), 'br': (1, 11), 'gzip': (1, 9)}
+RESPONSE_ENCODINGS = tuple(name for name, module in (('zstd', zstandard), ('br', brotli), ('gzip', zlib))
+                           if module is not None)
+REQUEST_DECODE_CHUNK = 64 * 1024
+# zstd expands at most about 32768-fold, so bodies are fed to it this many bytes at a time
+ZSTD_DECODE_SLICE = 1024
+
+# Histogram buckets for request metrics: latencies from tens of µs up, and array sizes by decade
+LATENCY_BUCKETS = (25e-6, 50e-6, 100e-6, 250e-6, 500e-6, 1e-3, 2.5e-3, 5e-3, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+ELEMENT_BUCKETS = (1, 10, 100, 1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+# Profiling: lifetime of signed X-Profile tokens and functions listed in X-Profile-Summary
+PROFILE_TOKEN_TTL = 300  # seconds
+PROFILE_SUMMARY_ENTRIES = 5
+
+# Number of NDJSON records converted between flushes of a streaming response
+STREAM_FLUSH_LINES = 256
+
+# Largest message accepted on the live WebSocket channel, and seconds a socket may stay idle
+# before the server closes it and frees its thread
+LIVE_MAX_MESSAGE_BYTES = 64 * 1024
+LIVE_IDLE_TIMEOUT = 60
+
+
+def config_from_env():
+    """Return the app settings given by NEUTRON_* environment variables."""
+    return {
+        'TOF_FLIGHT_PATHS': os.environ.get('NEUTRON_TOF_FLIGHT_PATHS'),
+        'PROFILE_SAMPLE_RATE': float(os.environ.get('NEUTRON_PROFILE_SAMPLE_RATE', 0)),
+        'PROFILE_SECRET': os.environ.get('NEUTRON_PROFILE_SECRET'),
+        'PROFILE_DIR': os.environ.get('NEUTRON_PROFILE_DIR'),
+        'JSON_FLOAT_DIGITS': int(os.environ.get('NEUTRON_JSON_FLOAT_DIGITS', 0)) or None,
+        'BATCH_WINDOW': float(os.environ.get('NEUTRON_BATCH_WINDOW_US', 0)) * 1e-6,
+        'BATCH_MAX_SIZE': int(os.environ.get('NEUTRON_BATCH_MAX_SIZE', 256)),
+        'COMPRESS_MIN_SIZE': int(os.environ.get('NEUTRON_COMPRESS_MIN_SIZE', 1024)),
+        'COMPRESS_LEVEL': (int(os.environ['NEUTRON_COMPRESS_LEVEL'])
+                           if os.environ.get('NEUTRON_COMPRESS_LEVEL') else None),
+        'LIVE_MAX_SOCKETS': int(os.environ.get('NEUTRON_LIVE_MAX_SOCKETS', 2)),
+        'MAX_DECODED_BYTES': int(os.environ.get('NEUTRON_MAX_DECODED_BYTES', 256 * 1024 * 1024)),
+    }
+
+
+# HTML Dashboard Template, rendered on first use with the URLs of its assets
+DASHBOARD_HTML = '''
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Neutron Converter</title>
+    <link rel="stylesheet" href="{{ css_url }}">
+</head>
+<body>
+    <div class="container">
+        <h1>⚛️ Neutron Converter</h1>
+        <p class="subtitle">Convert between energy, velocity, and wavelength</p>
+        
+        <div class="info">
+            Type a value in any field and the other properties update instantly. Conversions run in
+            your browser with the same constants as the server, so typing causes no server load.
+            Use Verify to check a value with a single request, or turn on checking as you type to
+            compare every value over a live connection.
+        </div>
+        
+        <form id="converterForm">
+            <div class="form-group">
+                <label for="energy">Energy</label>
+                <div class="input-group">
+                    <input type="number" id="energy" placeholder="e.g., 25" step="any">
+                    <select disabled>
+                        <option>meV</option>
+                    </select>
+                </div>
+            </div>
+            
+            <div class="form-group">
+                <label for="velocity">Velocity</label>
+                <div class="input-group">
+                    <input type="number" id="velocity" placeholder="e.g., 2187.9" step="any">
+                    <select disabled>
+                        <option>m/s</option>
+                    </select>
+                </div>
+            </div>
+            
+            <div class="form-group">
+                <label for="wavelength">Wavelength</label>
+                <div class="input-group">
+                    <input type="number" id="wavelength" placeholder="e.g., 1.8064" step="any">
+                    <select disabled>
+                        <option>Å</option>
+                    </select>
+                </div>
+            </div>
+            
+            <label class="toggle">
+                <input type="checkbox" id="liveCheck"> Check with the server as I type
+            </label>
+            
+            <button type="submit">Verify with server</button>
+        </form>
+        
+        <div class="loading" id="loading">
+            <div class="spinner"></div>
+        </div>
+        
+        <div class="error" id="error"></div>
+        <div class="status" id="status"></div>
+        
+        <div class="results" id="results">
+            <div class="result-item">
+                <div class="result-label">Energy</div>
+                <div class="result-value"><span id="resultEnergy">-</span> meV</div>
+            </div>
+            <div class="result-item">
+                <div class="result-label">Velocity</div>
+                <div class="result-value"><span id="resultVelocity">-</span> m/s</div>
+            </div>
+            <div class="result-item">
+                <div class="result-label">Wavelength</div>
+                <div class="result-value"><span id="resultWavelength">-</span> Å</div>
+            </div>
+        </div>
+        
+        <h2>Range</h2>
+        <form id="rangeForm">
+            <div class="input-group form-group">
+                <select id="rangeQuantity">
+                    <option value="energy">Energy (meV)</option>
+                    <option value="velocity">Velocity (m/s)</option>
+                    <option value="wavelength">Wavelength (Å)</option>
+                </select>
+                <input type="number" id="rangeStart" value="0.1" step="any" aria-label="Start">
+                <input type="number" id="rangeStop" value="1000" step="any" aria-label="Stop">
+                <input type="number" id="rangeCount" value="200" min="2" max="10000" aria-label="Points">
+                <select id="rangeSpacing">
+                    <option value="log">log</option>
+                    <option value="linear">linear</option>
+                </select>
+            </div>
+            <button type="submit">Plot</button>
+        </form>
+        <div class="error" id="rangeError"></div>
+        <canvas id="plot" width="520" height="360"></canvas>
+        
+        <h2>Batch upload</h2>
+        <form id="batchForm">
+            <div class="input-group form-group">
+                <select id="batchQuantity">
+                    <option value="energy">Energy (meV)</option>
+                    <option value="velocity">Velocity (m/s)</option>
+                    <option value="wavelength">Wavelength (Å)</option>
+                </select>
+                <input type="file" id="batchFile" accept=".csv,.txt,.dat,text/plain">
+            </div>
+            <button type="submit">Convert file</button>
+        </form>
+        <div class="error" id="batchError"></div>
+        <div class="status" id="batchStatus"></div>
+    </div>
+    
+    <script src="{{ js_url }}"></script>
+</body>
+</html>
+'''
+
+# Dashboard stylesheet, served from a content-addressed URL
+DASHBOARD_CSS = '''
+* { margin: 0; padding: 0; box-sizing: border-box; }
+body {
+    font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    min-height: 100vh;
+    display: flex;
+    justify-content: center;
+    align-items: center;
+    padding: 20px;
+}
+.container {
+    background: white;
+    border-radius: 12px;
+    box-shadow: 0 20px 60px rgba(0, 0, 0, 0.3);
+    padding: 40px;
+    max-width: 600px;
+    width: 100%;
+}
+h1 {
+    color: #333;
+    margin-bottom: 10px;
+    font-size: 28px;
+}
+.subtitle {
+    color: #666;
+    margin-bottom: 30px;
+    font-size: 14px;
+}
+.form-group {
+    margin-bottom: 25px;
+}
+label {
+    display: block;
+    margin-bottom: 8px;
+    color: #333;
+    font-weight: 600;
+    font-size: 14px;
+}
+input, select {
+    width: 100%;
+    padding: 12px;
+    border: 2px solid #e0e0e0;
+    border-radius: 6px;
+    font-size: 14px;
+    transition: border-color 0.3s;
+}
+input:focus, select:focus {
+    outline: none;
+    border-color: #667eea;
+}
+.input-group {
+    display: flex;
+    gap: 10px;
+}
+.input-group input {
+    flex: 1;
+}
+.input-group select {
+    flex: 0.4;
+}
+.toggle {
+    display: flex;
+    align-items: center;
+    gap: 8px;
+    margin-bottom: 15px;
+    font-weight: normal;
+}
+.toggle input {
+    width: auto;
+}
+button {
+    width: 100%;
+    padding: 13px;
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    color: white;
+    border: none;
+    border-radius: 6px;
+    font-size: 16px;
+    font-weight: 600;
+    cursor: pointer;
+    transition: transform 0.2s, box-shadow 0.2s;
+}
+button:hover {
+    transform: translateY(-2px);
+    box-shadow: 0 10px 20px rgba(102, 126, 234, 0.3);
+}
+button:active {
+    transform: translateY(0);
+}
+.results {
+    margin-top: 30px;
+    padding: 20px;
+    background: #f8f9fa;
+    border-radius: 8px;
+    border-left: 4px solid #667eea;
+    display: none;
+}
+.results.show {
+    display: block;
+}
+.result-item {
+    margin-bottom: 15px;
+    padding-bottom: 15px;
+    border-bottom: 1px solid #e0e0e0;
+}
+.result-item:last-child {
+    margin-bottom: 0;
+    padding-bottom: 0;
+    border-bottom: none;
+}
+.result-label {
+    color: #666;
+    font-size: 13px;
+    font-weight: 600;
+    text-transform: uppercase;
+    letter-spacing: 0.5px;
+}
+.result-value {
+    color: #333;
+    font-size: 20px;
+    font-weight: 700;
+    margin-top: 5px;
+    font-family: 'Courier New', monospace;
+}
+.error {
+    background: #fee;
+    color: #c33;
+    padding: 15px;
+    border-radius: 6px;
+    margin-top: 20px;
+    display: none;
+    border-left: 4px solid #c33;
+}
+.error.show {
+    display: block;
+}
+.info {
+    background: #f0f4ff;
+    color: #667eea;
+    padding: 15px;
+    border-radius: 6px;
+    margin-bottom: 25px;
+    font-size: 13px;
+    line-height: 1.6;
+    border-left: 4px solid #667eea;
+}
+.loading {
+    display: none;
+    text-align: center;
+    margin: 20px 0;
+}
+.spinner {
+    border: 3px solid #f3f3f3;
+    border-top: 3px solid #667eea;
+    border-radius: 50%;
+    width: 30px;
+    height: 30px;
+    animation: spin 1s linear infinite;
+    margin: 0 auto;
+}
+@keyframes spin {
+    0% { transform: rotate(0deg); }
+    100% { transform: rotate(360deg); }
+}
+h2 {
+    color: #333;
+    margin: 35px 0 15px;
+    font-size: 20px;
+}
+.status {
+    margin-top: 20px;
+    font-size: 13px;
+    color: #555;
+    display: none;
+}
+.status.show {
+    display: block;
+}
+.status a {
+    color: #667eea;
+    font-weight: 600;
+}
+input[type="file"] {
+    padding: 9px;
+}
+canvas {
+    width: 100%;
+    margin-top: 20px;
+    display: none;
+}
+canvas.show {
+    display: block;
+}
+'''
+
+# Dashboard script, served from a content-addressed URL
+DASHBOARD_JS = '''
+// Conversion constants and validation rules, taken from the server at build time
+const CONSTANTS = {{ constants|tojson }};
+const RULES = {{ rules|tojson }};
+const FIELDS = ['energy_meV', 'velocity_ms', 'wavelength_angstrom'];
+const LABELS = {energy_meV: 'Energy (meV)', velocity_ms: 'Velocity (m/s)', wavelength_angstrom: 'Wavelength (Å)'};
+
+const form = document.getElementById('converterForm');
+const inputs = {
+    energy: document.getElementById('energy'),
+    velocity: document.getElementById('velocity'),
+    wavelength: document.getElementById('wavelength')
+};
+const resultsDiv = document.getElementById('results');
+const errorDiv = document.getElementById('error');
+const statusDiv = document.getElementById('status');
+const loading = document.getElementById('loading');
+const liveCheck = document.getElementById('liveCheck');
+
+// Port of NeutronConverter.convert_all: every output from one square root or reciprocal
+function convertAll(quantity, value) {
+    if (quantity === 'energy') {
+        const root = Math.sqrt(value);
+        return {
+            energy_meV: value,
+            velocity_ms: CONSTANTS.VELOCITY_PER_SQRT_MEV * root,
+            wavelength_angstrom: CONSTANTS.WAVELENGTH_SQRT_ENERGY / root
+        };
+    }
+    if (quantity === 'velocity') {
+        return {
+            energy_meV: CONSTANTS.MEV_PER_VELOCITY_SQUARED * (value * value),
+            velocity_ms: value,
+            wavelength_angstrom: CONSTANTS.WAVELENGTH_VELOCITY_PRODUCT / value
+        };
+    }
+    const reciprocal = 1.0 / value;
+    return {
+        energy_meV: CONSTANTS.ENERGY_WAVELENGTH_SQUARED * (reciprocal * reciprocal),
+        velocity_ms: CONSTANTS.WAVELENGTH_VELOCITY_PRODUCT * reciprocal,
+        wavelength_angstrom: value
+    };
+}
+
+function validate(quantity, value) {
+    const name = quantity.charAt(0).toUpperCase() + quantity.slice(1);
+    if (!Number.isFinite(value)) {
+        return name + ' must be a number';
+    }
+    const [allowZero, message] = RULES[quantity];
+    if (value < 0 || (value === 0 && !allowZero)) {
+        return message;
+    }
+    return null;
+}
+
+function currentInput() {
+    for (const [quantity, input] of Object.entries(inputs)) {
+        if (input.value !== '') {
+            return [quantity, parseFloat(input.value)];
+        }
+    }
+    return [null, null];
+}
+
+// Convert as the user types; the other inputs are cleared so one field is the source
+for (const [quantity, input] of Object.entries(inputs)) {
+    input.addEventListener('input', () => {
+        for (const [other, otherInput] of Object.entries(inputs)) {
+            if (other !== quantity) {
+                otherInput.value = '';
+            }
+        }
+        convertLocally();
+    });
+}
+
+function convertLocally() {
+    const [quantity, value] = currentInput();
+    errorDiv.classList.remove('show');
+    statusDiv.classList.remove('show');
+    if (quantity === null) {
+        resultsDiv.classList.remove('show');
+        return null;
+    }
+    const error = validate(quantity, value);
+    if (error) {
+        resultsDiv.classList.remove('show');
+        showError(errorDiv, error);
+        return null;
+    }
+    const result = convertAll(quantity, value);
+    displayResults(result);
+    if (!liveCheck.checked) {
+        return [quantity, value, result];
+    }
+    if (live !== null) {
+        liveId += 1;
+        liveLocal = result;
+        live.send(JSON.stringify({id: liveId, [quantity]: value}));
+        clearTimeout(liveIdle);
+        liveIdle = setTimeout(() => live.close(), LIVE_IDLE_MS);
+    } else {
+        openLive();
+    }
+    return [quantity, value, result];
+}
+
+// Live channel: with "Check with the server as I type" on, values are also converted by the
+// server over one WebSocket. It is opened on the first typed value and closed when typing stops
+// or the check is turned off, since an open socket holds a server thread; when the server
+// refuses it, Verify still works.
+const LIVE_IDLE_MS = 20000;
+const LIVE_RETRY_MS = 60000;
+let live = null;
+let liveOpening = false;
+let liveRetryAt = 0;
+let liveIdle = null;
+let liveId = 0;
+let liveLocal = null;
+
+function openLive() {
+    if (!('WebSocket' in window) || liveOpening || Date.now() < liveRetryAt) {
+        return;
+    }
+    liveOpening = true;
+    const scheme = location.protocol === 'https:' ? 'wss://' : 'ws://';
+    const socket = new WebSocket(scheme + location.host + '/convert/live');
+    socket.addEventListener('open', () => {
+        liveOpening = false;
+        live = socket;
+        if (!liveCheck.checked) {
+            socket.close();
+            return;
+        }
+        // Check the value typed while the socket was opening
+        convertLocally();
+    });
+    socket.addEventListener('message', (event) => {
+        const data = JSON.parse(event.data);
+        // Replies to values since replaced by newer typing are stale
+        if (data.id !== liveId) {
+            return;
+        }
+        if (data.error) {
+            showError(errorDiv, data.error);
+        } else {
+            showAgreement(data, liveLocal);
+        }
+    });
+    socket.addEventListener('close', () => {
+        // A socket that never opened was refused (busy server, or no WebSocket support)
+        if (live !== socket) {
+            liveOpening = false;
+            liveRetryAt = Date.now() + LIVE_RETRY_MS;
+            return;
+        }
+        live = null;
+        clearTimeout(liveIdle);
+    });
+}
+
+liveCheck.addEventListener('change', () => {
+    if (liveCheck.checked) {
+        convertLocally();
+    } else if (live !== null) {
+        live.close();
+    }
+});
+
+form.addEventListener('submit', async (e) => {
+    e.preventDefault();
+    await verify();
+});
+
+// Optional consistency check against the server's cacheable GET route
+async function verify() {
+    const converted = convertLocally();
+    if (converted === null) {
+        if (currentInput()[0] === null) {
+            showError(errorDiv, 'Please enter a value');
+        }
+        return;
+    }
+    const [quantity, value, local] = converted;
+
+    loading.style.display = 'block';
+    try {
+        const response = await fetch('/convert/full?' + new URLSearchParams({[quantity]: value}));
+        const data = await response.json();
+        if (!response.ok) {
+            showError(errorDiv, data.error || 'Conversion failed');
+            return;
+        }
+        showAgreement(data, local);
+    } catch (err) {
+        showError(errorDiv, 'Network error: ' + err.message);
+    } finally {
+        loading.style.display = 'none';
+    }
+}
+
+function showAgreement(data, local) {
+    // Divergent values are null in JSON and infinite locally
+    const worst = Math.max(...FIELDS.filter(field => data[field] !== null).map(field =>
+        Math.abs(data[field] - local[field]) / Math.max(Math.abs(data[field]), Number.MIN_VALUE)));
+    statusDiv.textContent = worst <= 1e-12 ?
+        'Server agrees (largest relative difference ' + worst.toExponential(1) + ')' :
+        'Server result differs by up to ' + worst.toExponential(2) + ' (relative)';
+    statusDiv.classList.add('show');
+}
+
+function formatValue(value, digits) {
+    return Number.isFinite(value) ? value.toFixed(digits) : '∞';
+}
+
+function displayResults(data) {
+    document.getElementById('resultEnergy').textContent = formatValue(data.energy_meV, 6);
+    document.getElementById('resultVelocity').textContent = formatValue(data.velocity_ms, 2);
+    document.getElementById('resultWavelength').textContent = formatValue(data.wavelength_angstrom, 6);
+    resultsDiv.classList.add('show');
+}
+
+function showError(element, message) {
+    element.textContent = message;
+    element.classList.add('show');
+}
+
+// Range mode: convert a grid in the browser and plot the other two quantities against it
+const rangeForm = document.getElementById('rangeForm');
+const rangeError = document.getElementById('rangeError');
+const plot = document.getElementById('plot');
+
+rangeForm.addEventListener('submit', (e) => {
+    e.preventDefault();
+    rangeError.classList.remove('show');
+    const quantity = document.getElementById('rangeQuantity').value;
+    const start = parseFloat(document.getElementById('rangeStart').value);
+    const stop = parseFloat(document.getElementById('rangeStop').value);
+    const count = parseInt(document.getElementById('rangeCount').value, 10);
+    const log = document.getElementById('rangeSpacing').value === 'log';
+
+    const error = validate(quantity, Math.min(start, stop)) || validate(quantity, Math.max(start, stop));
+    if (error || !(count >= 2 && count <= 10000) || (log && Math.min(start, stop) <= 0)) {
+        showError(rangeError, error || (log ? 'Use 2 to 10000 points and positive limits for log spacing' :
+                                              'Use 2 to 10000 points'));
+        plot.classList.remove('show');
+        return;
+    }
+
+    const grid = [];
+    for (let i = 0; i < count; i++) {
+        const t = i / (count - 1);
+        grid.push(log ? start * Math.pow(stop / start, t) : start + (stop - start) * t);
+    }
+    const rows = grid.map(value => convertAll(quantity, value));
+    const inputField = FIELDS.find(field => field.startsWith(quantity));
+    drawPlot(rows, inputField, FIELDS.filter(field => field !== inputField), log);
+});
+
+function drawPlot(rows, xField, yFields, log) {
+    const ctx = plot.getContext('2d');
+    const width = plot.width;
+    const panelHeight = plot.height / yFields.length;
+    const margin = {left: 70, right: 15, top: 20, bottom: 30};
+    const scale = value => log ? Math.log10(value) : value;
+    const colors = ['#667eea', '#764ba2'];
+
+    ctx.clearRect(0, 0, width, plot.height);
+    ctx.font = '11px sans-serif';
+    yFields.forEach((yField, panel) => {
+        const points = rows.map(row => [scale(row[xField]), scale(row[yField])])
+            .filter(([x, y]) => Number.isFinite(x) && Number.isFinite(y));
+        if (points.length < 2) {
+            return;
+        }
+        const xs = points.map(p => p[0]);
+        const ys = points.map(p => p[1]);
+        const [xMin, xMax] = [Math.min(...xs), Math.max(...xs)];
+        const [yMin, yMax] = [Math.min(...ys), Math.max(...ys)];
+        const top = panel * panelHeight + margin.top;
+        const height = panelHeight - margin.top - margin.bottom;
+        const px = x => margin.left + (x - xMin) / ((xMax - xMin) || 1) * (width - margin.left - margin.right);
+        const py = y => top + height - (y - yMin) / ((yMax - yMin) || 1) * height;
+        const label = value => (log ? Math.pow(10, value) : value).toPrecision(3);
+
+        ctx.strokeStyle = '#ccc';
+        ctx.strokeRect(margin.left, top, width - margin.left - margin.right, height);
+        ctx.fillStyle = '#666';
+        ctx.fillText(LABELS[yField] + (log ? ' — log scale' : ''), margin.left, top - 6);
+        ctx.fillText(label(yMax), 5, top + 10);
+        ctx.fillText(label(yMin), 5, top + height);
+        ctx.fillText(label(xMin), margin.left, top + height + 14);
+        ctx.fillText(label(xMax), width - margin.right - 40, top + height + 14);
+        ctx.fillText(LABELS[xField], width / 2 - 30, top + height + 14);
+
+        ctx.strokeStyle = colors[panel];
+        ctx.lineWidth = 2;
+        ctx.beginPath();
+        points.forEach(([x, y], i) => i ? ctx.lineTo(px(x), py(y)) : ctx.moveTo(px(x), py(y)));
+        ctx.stroke();
+    });
+    plot.classList.add('show');
+}
+
+// Batch upload: numbers from a text or CSV file, converted by the server's binary batch route
+const batchForm = document.getElementById('batchForm');
+const batchError = document.getElementById('batchError');
+const batchStatus = document.getElementById('batchStatus');
+
+batchForm.addEventListener('submit', async (e) => {
+    e.preventDefault();
+    batchError.classList.remove('show');
+    batchStatus.classList.remove('show');
+    const file = document.getElementById('batchFile').files[0];
+    const quantity = document.getElementById('batchQuantity').value;
+    if (!file) {
+        showError(batchError, 'Choose a file of numbers');
+        return;
+    }
+
+    const values = (await file.text()).split(/[\\s,;]+/).filter(token => token !== '').map(Number);
+    if (values.length === 0 || values.some(value => !Number.isFinite(value))) {
+        showError(batchError, 'The file must contain only numbers');
+        return;
+    }
+
+    loading.style.display = 'block';
+    try {
+        const response = await fetch('/convert/batch?' + new URLSearchParams({quantity}), {
+            method: 'POST',
+            headers: {'Content-Type': 'application/octet-stream', 'Accept': 'application/octet-stream'},
+            body: new Float64Array(values).buffer
+        });
+        if (!response.ok) {
+            const data = await response.json();
+            showError(batchError, data.error || 'Conversion failed');
+            return;
+        }
+        const results = new Float64Array(await response.arrayBuffer());
+        const count = values.length;
+        const lines = [FIELDS.join(',')];
+        for (let i = 0; i < count; i++) {
+            lines.push([results[i], results[count + i], results[2 * count + i]].join(','));
+        }
+        const url = URL.createObjectURL(new Blob([lines.join('\\n') + '\\n'], {type: 'text/csv'}));
+        batchStatus.innerHTML = '';
+        const link = document.createElement('a');
+        link.href = url;
+        link.download = file.name.replace(/\\.[^.]*$/, '') + '_converted.csv';
+        link.textContent = 'Download ' + count + ' converted values (CSV)';
+        batchStatus.appendChild(link);
+        batchStatus.classList.add('show');
+    } catch (err) {
+        showError(batchError, 'Network error: ' + err.message);
+    } finally {
+        loading.style.display = 'none';
+    }
+});
+'''
+
+
+# Request metrics of this process, registered on first use by request_metrics()
+Metrics = collections.namedtuple('Metrics', 'requests latency phases elements batch_sizes')
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def request_metrics():
+    """Return the request metrics, registering them and importing prometheus_client on first use.
+
+    With several worker processes, set PROMETHEUS_MULTIPROC_DIR to an empty
+    directory before starting the server so that all workers' samples are
+    aggregated.
+    """
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            from prometheus_client import Counter, Histogram
+            
+            _metrics = Metrics(
+                requests=Counter(
+                    'neutron_requests_total', 'HTTP requests by route, method and status.',
+                    ['route', 'method', 'status']),
+                latency=Histogram(
+                    'neutron_request_duration_seconds', 'Time to handle a request, by route.',
+                    ['route'], buckets=LATENCY_BUCKETS),
+                phases=Counter(
+                    'neutron_request_phase_seconds',
+                    'Total time spent decoding JSON, converting and encoding JSON, by route.',
+                    ['route', 'phase']),
+                elements=Histogram(
+                    'neutron_request_elements',
+                    'Elements converted by array, batch, event and table requests, by route.',
+                    ['route'], buckets=ELEMENT_BUCKETS),
+                batch_sizes=Histogram(
+                    'neutron_coalesced_batch_size',
+                    'Scalar requests evaluated together by the micro-batcher, per kernel call.',
+                    buckets=BATCH_SIZE_BUCKETS))
+        return _metrics
+
+
+@functools.lru_cache(maxsize=None)
+def _metric(metric, *labelvalues):
+    """Return the child of a labelled metric, caching the label lookup."""
+    return metric.labels(*labelvalues)
+
+
+@contextlib.contextmanager
+def _timed(phase):
+    """Add the time spent in the block to the current request's timing for a phase."""
+    if not has_request_context():
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases = g.setdefault('phase_seconds', {})
+        phases[phase] = phases.get(phase, 0.0) + time.perf_counter() - start
+
+
+def _count_elements(count):
+    """Record the number of elements converted by the current request."""
+    g.elements = count
+
+
+class InstrumentedRequest(Request):
+    """Request that times JSON decoding."""
+    
+    def get_json(self, *args, **kwargs):
+        with _timed('decode'):
+            return super().get_json(*args, **kwargs)
+
+
+def round_significant(values, digits):
+    """Round a float or an array of floats to a number of significant digits.
+
+    Zeros and non-finite values are returned unchanged. Rounded values are the
+    nearest float64 to the rounded decimal, so they print with at most digits
+    significant digits. Arrays give the same values as scalars: elements the
+    vectorized arithmetic cannot round exactly are formatted one at a time.
+    """
+    if isinstance(values, float):
+        if not math.isfinite(values):
+            return values
+        rounded = float(f'{values:.{digits}g}')
+        # Rounding the largest floats up overflows, as it does for arrays
+        return rounded if math.isfinite(rounded) else values
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        exponent = digits - 1 - np.floor(np.log10(np.abs(values)))
+        exponent = np.where(np.isfinite(exponent), exponent, 0.0)
+        # Scale by a power of ten, exact up to 1e22, so that the final multiply or divide rounds
+        # correctly when the rounded integer is exact too (up to 15 digits)
+        scale = 10.0 ** np.abs(exponent)
+        scaled = np.where(exponent >= 0, values * scale, values / scale)
+        whole = np.round(scaled)
+        rounded = np.where(exponent >= 0, whole / scale, whole * scale)
+        # The scaled value is within half an ulp of the exact one and below 2**52, so only its
+        # exact ties can round differently; log10 may also have been off by one near powers of ten
+        magnitude = np.abs(scaled)
+        inexact = ((np.abs(scaled - whole) == 0.5)
+                   | (magnitude < 10.0 ** (digits - 1)) | (magnitude >= 10.0 ** digits)
+                   | (np.abs(exponent) > 22) | (digits > 15))
+        inexact &= np.isfinite(values) & (values != 0)
+    for index in np.flatnonzero(inexact):
+        rounded.flat[index] = round_significant(float(values.flat[index]), digits)
+    return np.where(np.isfinite(rounded), rounded, values)
+
+
+def _float_digits():
+    """Return the significant digits the current response is rounded to, or None for full precision."""
+    return g.get('float_digits') if has_request_context() else None
+
+
+def _round_floats(obj, digits):
+    """Round the float values of a response object, descending into nested dicts."""
+    if isinstance(obj, dict):
+        return {key: _round_floats(value, digits) for key, value in obj.items()}
+    if isinstance(obj, float):
+        return round_significant(obj, digits)
+    return obj
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider that encodes with orjson when it is installed.
+
+    Floats in dict values are rounded to the significant digits requested
+    for the response (see read_float_digits); arrays are rounded where they
+    are converted to lists, in _array_to_json. Encoding is timed as the
+    request's encode phase. Without orjson, when json-specific keyword
+    arguments are passed, or for objects orjson cannot encode (integers
+    beyond 64 bits echoed from the request), the stdlib json module is used.
+    """
+    
+    orjson_options = orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY if orjson else 0
+    
+    def dumps(self, obj, **kwargs):
+        with _timed('encode'):
+            digits = _float_digits()
+            if digits:
+                obj = _round_floats(obj, digits)
+            if orjson is not None and not kwargs:
+                try:
+                    return orjson.dumps(obj, default=self.default, option=self.orjson_options).decode()
+                except orjson.JSONEncodeError:
+                    pass
+            return super().dumps(obj, **kwargs)
+    
+    def response(self, *args, **kwargs):
+        if orjson is None or self._app.debug:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        with _timed('encode'):
+            digits = _float_digits()
+            if digits:
+                obj = _round_floats(obj, digits)
+            try:
+                body = orjson.dumps(obj, default=self.default, option=self.orjson_options | orjson.OPT_APPEND_NEWLINE)
+            except orjson.JSONEncodeError:
+                body = super().dumps(obj) + '\n'
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+@api.before_app_request
+def start_timer():
+    """Note when handling of the request started."""
+    g.request_start = time.perf_counter()
+
+
+@api.before_app_request
+def read_float_digits():
+    """Set the significant digits for response floats from the digits query parameter or the config."""
+    digits = request.args.get('digits')
+    if digits is None:
+        g.float_digits = current_app.config['JSON_FLOAT_DIGITS']
+        return None
+    try:
+        g.float_digits = int(digits)
+    except ValueError:
+        g.float_digits = 0
+    if not 1 <= g.float_digits <= MAX_FLOAT_DIGITS:
+        g.float_digits = None
+        return jsonify({'error': f'Parameter digits must be an integer from 1 to {MAX_FLOAT_DIGITS}'}), 400
+    return None
+
+
+@api.after_app_request
+def record_metrics(response):
+    """Record the request count, latency, phase timings and element count."""
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics = request_metrics()
+    _metric(metrics.requests, route, request.method, response.status_code).inc()
+    if 'request_start' in g:
+        _metric(metrics.latency, route).observe(time.perf_counter() - g.request_start)
+    for phase, seconds in g.get('phase_seconds', {}).items():
+        _metric(metrics.phases, route, phase).inc(seconds)
+    if 'elements' in g:
+        _metric(metrics.elements, route).observe(g.elements)
+    return response
+
+
+def _compressor(encoding, level):
+    """Return the compress, flush and finish functions of a new streaming compressor."""
+    if encoding == 'zstd':
+        stream = zstandard.ZstdCompressor(level=level).compressobj()
+        return stream.compress, lambda: stream.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK), stream.flush
+    if encoding == 'br':
+        stream = brotli.Compressor(quality=level)
+        return stream.process, stream.flush, stream.finish
+    stream = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return stream.compress, lambda: stream.flush(zlib.Z_SYNC_FLUSH), stream.flush
+
+
+def _compress_chunks(chunks, compressor):
+    """Compress a response body as it is generated, flushing after every chunk."""
+    compress, flush, finish = compressor
+    try:
+        for chunk in chunks:
+            data = compress(chunk.encode() if isinstance(chunk, str) else chunk) + flush()
+            if data:
+                yield data
+        yield finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+@api.after_app_request
+def compress_response(response):
+    """Compress the response body in the best coding the client accepts.
+
+    Bodies of at least COMPRESS_MIN_SIZE bytes, and all streamed bodies, are
+    compressed at COMPRESS_LEVEL (capped at each coding's highest level), or
+    each coding's default level when it is None; a level of 0 turns
+    compression off. Compressed responses get weak ETags, since their bytes
+    differ from the identity body the ETag was computed for.
+    """
+    level = current_app.config['COMPRESS_LEVEL']
+    if (level == 0 or response.content_encoding or response.direct_passthrough
+            or response.status_code < 200 or response.status_code in (204, 304)):
+        if response.status_code == 304:
+            # Keep the validator the client holds, which is weak if it has a compressed body
+            tag, weak = response.get_etag()
+            if tag and not weak and request.if_none_match.is_weak(tag):
+                response.set_etag(tag, weak=True)
+        return response
+    if not response.is_streamed and len(response.get_data()) < current_app.config['COMPRESS_MIN_SIZE']:
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(RESPONSE_ENCODINGS)
+    if encoding is None:
+        return response
+    default, highest = COMPRESS_LEVELS[encoding]
+    compressor = _compressor(encoding, default if level is None else min(level, highest))
+    if response.is_streamed:
+        response.response = _compress_chunks(response.response, compressor)
+        response.headers.pop('Content-Length', None)
+    else:
+        with _timed('compress'):
+            compress, _, finish = compressor
+            response.set_data(compress(response.get_data()) + finish())
+    response.content_encoding = encoding
+    tag, weak = response.get_etag()
+    if tag and not weak:
+        response.set_etag(tag, weak=True)
+    return response
+
+
+def profile_token(secret, ttl=PROFILE_TOKEN_TTL):
+    """Return a signed X-Profile header value that stays valid for ttl seconds."""
+    expires = str(int(time.time()) + ttl)
+    signature = hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return f'{expires}:{signature}'
+
+
+def _valid_profile_token(token, secret):
+    """Return True if an X-Profile header value is correctly signed and unexpired."""
+    expires, _, signature = token.partition(':')
+    expected = hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature, expected) and expires.isdigit() and int(expires) >= time.time()
+
+
+class ProfilingMiddleware:
+    """WSGI middleware that runs cProfile around a sample of requests.
+
+    A request is profiled when a random draw falls under the
+    PROFILE_SAMPLE_RATE config value, or when it carries an X-Profile header
+    signed with PROFILE_SECRET (see profile_token). Profiled responses get an
+    X-Profile-Summary header listing the functions with the most own time,
+    and the full profile is written to PROFILE_DIR when that is set. With no
+    sample rate and no secret configured, requests go straight through.
+    """
+    
+    def __init__(self, wsgi_app, config):
+        self.wsgi_app = wsgi_app
+        self.config = config
+    
+    def __call__(self, environ, start_response):
+        rate = self.config['PROFILE_SAMPLE_RATE']
+        secret = self.config['PROFILE_SECRET']
+        if not rate and not secret:
+            return self.wsgi_app(environ, start_response)
+        token = environ.get('HTTP_X_PROFILE')
+        sampled = rate and random.random() < rate
+        if not sampled and not (secret and token and _valid_profile_token(token, secret)):
+            return self.wsgi_app(environ, start_response)
+        
+        # Hold back the status and headers until the profile summary is known
+        captured = []
+        
+        def deferred_start_response(status, headers, exc_info=None):
+            captured[:] = [status, headers, exc_info]
+        
+        profiler = cProfile.Profile()
+        body = profiler.runcall(self.wsgi_app, environ, deferred_start_response)
+        status, headers, exc_info = captured
+        headers = [*headers, ('X-Profile-Summary', self._summary(profiler))]
+        if self.config['PROFILE_DIR']:
+            route = environ.get('PATH_INFO', '').strip('/').replace('/', '_') or 'root'
+            name = f'{time.time():.6f}-{os.getpid()}-{route}.prof'
+            profiler.dump_stats(os.path.join(self.config['PROFILE_DIR'], name))
+            headers.append(('X-Profile-File', name))
+        start_response(status, headers, exc_info)
+        return body
+    
+    @staticmethod
+    def _summary(profiler):
+        """Summarize a profile as the total time and the functions with the most own time."""
+        stats = pstats.Stats(profiler).stats
+        total = sum(entry[2] for entry in stats.values())
+        top = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:PROFILE_SUMMARY_ENTRIES]
+        entries = [f'total={total * 1e3:.3f}ms']
+        for (filename, line, function), entry in top:
+            entries.append(f'{os.path.basename(filename)}:{line}({function}) {entry[2] * 1e3:.3f}ms')
+        return '; '.join(entries).encode('ascii', 'replace').decode()
+
+
+def _decompressor(encoding):
+    """Return the decompress and finished functions of a new decompressor for a content coding, or None.
+
+    decompress takes successive chunks of a body and yields their
+    decompressed data in pieces of about REQUEST_DECODE_CHUNK bytes, so a
+    small body that expands enormously can be stopped part way; finished
+    tells whether the compressed stream has ended, so that truncated bodies
+    can be rejected. br needs brotli 1.1 or later, which can limit its output.
+    """
+    if encoding in ('gzip', 'x-gzip', 'deflate'):
+        # Accepts both gzip and zlib headers
+        stream = zlib.decompressobj(32 + zlib.MAX_WBITS)
+        
+        def decompress(chunk):
+            while chunk:
+                yield stream.decompress(chunk, REQUEST_DECODE_CHUNK)
+                chunk = stream.unconsumed_tail
+        return decompress, lambda: stream.eof
+    if encoding == 'br' and brotli is not None and hasattr(brotli.Decompressor, 'can_accept_more_data'):
+        stream = brotli.Decompressor()
+        
+        def decompress(chunk):
+            piece = stream.process(chunk, output_buffer_limit=REQUEST_DECODE_CHUNK)
+            while piece:
+                yield piece
+                piece = stream.process(b'', output_buffer_limit=REQUEST_DECODE_CHUNK)
+        return decompress, stream.is_finished
+    if encoding == 'zstd' and zstandard is not None:
+        stream = zstandard.ZstdDecompressor().decompressobj()
+        
+        def decompress(chunk):
+            for start in range(0, len(chunk), ZSTD_DECODE_SLICE):
+                yield stream.decompress(chunk[start:start + ZSTD_DECODE_SLICE])
+        return decompress, lambda: stream.eof
+    return None
+
+
+class _DecodedStream(io.RawIOBase):
+    """Readable stream that decompresses a request body as it is read.
+
+    Reading past max_size decompressed bytes (when it is not 0) raises
+    RequestEntityTooLarge.
+    """
+    
+    def __init__(self, stream, decompressor, encoding, max_size):
+        self._stream = stream
+        self._decompress, self._finished = decompressor
+        self._encoding = encoding
+        self._max_size = max_size
+        self._size = 0
+        self._pieces = iter(())
+        self._pending = memoryview(b'')
+        self._started = False
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        while not self._pending:
+            try:
+                piece = next(self._pieces, None)
+            except Exception as e:
+                raise BadRequest(f'Invalid {self._encoding} request body') from e
+            if piece is None:
+                chunk = self._stream.read(REQUEST_DECODE_CHUNK)
+                if not chunk:
+                    # An empty body is empty in any coding, but a started one must be complete
+                    if self._started and not self._finished():
+                        raise BadRequest(f'Invalid {self._encoding} request body')
+                    return 0
+                self._started = True
+                self._pieces = self._decompress(chunk)
+                continue
+            self._size += len(piece)
+            if self._max_size and self._size > self._max_size:
+                raise RequestEntityTooLarge(f'Decompressed request body is larger than {self._max_size} bytes')
+            self._pending = memoryview(piece)
+        count = min(len(buffer), len(self._pending))
+        buffer[:count] = self._pending[:count]
+        self._pending = self._pending[count:]
+        return count
+
+
+class RequestDecodingMiddleware:
+    """WSGI middleware that decompresses request bodies sent with a Content-Encoding.
+
+    gzip and deflate are always accepted, and br and zstd when brotli and
+    zstandard are installed; other codings are answered with 415. The body
+    is decompressed as the app reads it, so streamed uploads stay streamed.
+    The decompressed size is limited to the MAX_DECODED_BYTES config value
+    (0 for no limit), and to Flask's MAX_CONTENT_LENGTH when that is set.
+    """
+    
+    def __init__(self, wsgi_app, config):
+        self.wsgi_app = wsgi_app
+        self.config = config
+    
+    def __call__(self, environ, start_response):
+        encoding = environ.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+        if encoding in ('', 'identity'):
+            return self.wsgi_app(environ, start_response)
+        decompressor = _decompressor(encoding)
+        if decompressor is None:
+            accepted = ', '.join(name for name in ('gzip', 'deflate', 'br', 'zstd') if _decompressor(name))
+            response = Response(json.dumps({'error': f'Unsupported Content-Encoding; use one of {accepted}'}),
+                                status=415, mimetype='application/json')
+            return response(environ, start_response)
+        
+        stream = _DecodedStream(get_input_stream(environ), decompressor, encoding,
+                                self.config['MAX_DECODED_BYTES'])
+        environ['wsgi.input'] = io.BufferedReader(stream, REQUEST_DECODE_CHUNK)
+        environ['wsgi.input_terminated'] = True
+        environ.pop('CONTENT_LENGTH', None)
+        del environ['HTTP_CONTENT_ENCODING']
+        return self.wsgi_app(environ, start_response)
+
+
+# Seed for conversion ETags, so cached results are invalidated if the constants change
+_ETAG_SEED = repr((PLANCK_CONSTANT, NEUTRON_MASS, MEV_TO_JOULES)).encode()
+
+
+def _request_data():
+    """Return the conversion parameters: parsed query values for GET, the JSON body otherwise.
+
+    Returns None when the body is not a JSON object.
+    """
+    if request.method == 'GET':
+        return g.query_params
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else None
+
+
+def cacheable(view):
+    """Serve GET requests of a conversion route as cacheable responses.
+
+    Query values are normalized to floats, so '25', '25.0' and '2.5e1' share
+    one strong ETag derived from the route and the normalized input. A
+    matching If-None-Match is answered with 304 without running the
+    conversion, and successful responses are marked cacheable for
+    CONVERSION_CACHE_MAX_AGE. POST requests pass straight through.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != 'GET':
+            return view(*args, **kwargs)
+        
+        labels = {name: quantity.label for name, quantity in QUANTITIES.items()}
+        labels.update(UNCERTAINTY_PARAMETERS)
+        params = {}
+        for name, label in labels.items():
+            if name in request.args:
+                try:
+                    params[name] = float(request.args[name])
+                except ValueError:
+                    params[name] = math.nan
+                if not math.isfinite(params[name]):
+                    return jsonify({'error': f'{label} must be a finite number'}), 400
+        g.query_params = params
+        
+        key = request.path + ''.join(f'&{name}={value!r}' for name, value in sorted(params.items()))
+        if g.float_digits:
+            key += f'&digits={g.float_digits}'
+        etag = hashlib.sha1(_ETAG_SEED + key.encode()).hexdigest()
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = CONVERSION_CACHE_MAX_AGE
+        response.cache_control.immutable = True
+        return response
+    return wrapper
+
+
+def _prebuild(body, mimetype):
+    """Encode a static body once, with precompressed variants and a content-derived ETag."""
+    data = body.encode()
+    variants = {}
+    if brotli is not None:
+        variants['br'] = brotli.compress(data, quality=11)
+    variants['gzip'] = gzip.compress(data, compresslevel=9, mtime=0)
+    variants['identity'] = data
+    return {
+        'mimetype': mimetype,
+        'etag': hashlib.sha1(data).hexdigest()[:20],
+        'variants': variants
+    }
+
+
+def _send_prebuilt(asset, immutable):
+    """Send a prebuilt asset in the best encoding the client accepts."""
+    encoding = next(name for name in asset['variants']
+                    if name == 'identity' or request.accept_encodings[name])
+    response = Response(asset['variants'][encoding], mimetype=asset['mimetype'])
+    if encoding != 'identity':
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    response.set_etag(asset['etag'] if encoding == 'identity' else f"{asset['etag']}-{encoding}")
+    if immutable:
+        response.cache_control.public = True
+        response.cache_control.max_age = CONVERSION_CACHE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+@functools.lru_cache(maxsize=None)
+def dashboard_assets():
+    """Render the dashboard on first use and precompress it and its assets.
+
+    Returns the page and a dict of assets by name. The stylesheet and script
+    are served from URLs containing their content hash, so they can be
+    cached forever; the page itself is revalidated with its ETag.
+    """
+    constants = {name: getattr(neutron, name) for name in (
+        'VELOCITY_PER_SQRT_MEV', 'MEV_PER_VELOCITY_SQUARED', 'WAVELENGTH_VELOCITY_PRODUCT',
+        'WAVELENGTH_SQRT_ENERGY', 'ENERGY_WAVELENGTH_SQUARED')}
+    script = current_app.jinja_env.from_string(DASHBOARD_JS).render(constants=constants, rules=VALIDATION_RULES)
+    assets = {}
+    for name, body, mimetype in (('dashboard.css', DASHBOARD_CSS, 'text/css'),
+                                 ('dashboard.js', script, 'text/javascript')):
+        asset = _prebuild(body, mimetype)
+        stem, ext = os.path.splitext(name)
+        assets[f"{stem}.{asset['etag'][:12]}{ext}"] = asset
+    urls = {os.path.splitext(name)[1][1:] + '_url': f'/assets/{name}' for name in assets}
+    page = current_app.jinja_env.from_string(DASHBOARD_HTML).render(**urls)
+    return _prebuild(page, 'text/html'), assets
+
+
+@api.route('/', methods=['GET'])
+def dashboard():
+    """Serve the web dashboard."""
+    return _send_prebuilt(dashboard_assets()[0], immutable=False)
+
+
+@api.route('/assets/<name>', methods=['GET'])
+def dashboard_asset(name):
+    """Serve a dashboard stylesheet or script by its content-addressed name."""
+    asset = dashboard_assets()[1].get(name)
+    if asset is None:
+        abort(404)
+    return _send_prebuilt(asset, immutable=True)
+
+
+@api.route('/metrics', methods=['GET'])
+def metrics():
+    """Expose request metrics in the Prometheus text format."""
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest, multiprocess
+    
+    request_metrics()
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+@api.route('/health', methods=['GET'])
+def health():
+    """Health check endpoint."""
+    return jsonify({'status': 'healthy'}), 200
+
+
+def _scalar_error(quantity, value, target=None):
+    """Return the validation error for a scalar input, or None if it is valid.
+
+    With a target quantity, zero is also rejected when the target diverges there.
+    """
+    if isinstance(value, (list, tuple)):
+        return VALIDATION_MESSAGES[quantity][NOT_A_NUMBER]
+    return VALIDATION_MESSAGES[quantity][validate_values(quantity, value, target)[1]]
+
+
+def _invalid_elements(codes, messages):
+    """Describe the invalid elements of an array input by index, with the error message of each."""
+    index = np.flatnonzero(codes)
+    return {'index': index.tolist(), 'error': np.array(messages, dtype=object)[codes[index]].tolist()}
+
+
+def _apply_invalid_policy(values, codes, messages, policy):
+    """Handle the invalid elements of a validated array input under one of INVALID_POLICIES.
+
+    Returns a tuple of (values, keep, invalid): the values, with invalid
+    elements as NaN unless the policy is 'reject', the mask of elements to
+    convert (None for all of them) and the _invalid_elements report (None
+    when every element is valid). The caller rejects the request when there
+    is a report under 'reject'.
+    """
+    if not codes.any():
+        return values, None, None
+    invalid = _invalid_elements(codes, messages)
+    if policy == 'reject':
+        return values, None, invalid
+    return np.where(codes, np.nan, values), (codes == 0 if policy == 'drop' else None), invalid
+
+
+def _read_invalid_policy(data):
+    """Read the invalid-element policy of an array request. Returns a tuple of (policy, error)."""
+    policy = data.get('invalid', 'reject')
+    if policy not in INVALID_POLICIES:
+        return None, f"Parameter invalid must be {', '.join(INVALID_POLICIES[:-1])} or {INVALID_POLICIES[-1]}"
+    return policy, None
+
+
+_QUANTITY_CONVERTER = 'any(' + ', '.join(QUANTITIES) + ')'
+
+
+def _read_uncertainty(data, values):
+    """Read the standard uncertainty of the input values from a request.
+
+    ``uncertainty`` is absolute, in the units of the input, and
+    ``relative_uncertainty`` is a fraction of each value. Either may be a
+    number or, for array inputs, an array of the same length. Returns a tuple
+    of (uncertainty, error); uncertainty is None when neither is given.
+    """
+    provided = [name for name in UNCERTAINTY_PARAMETERS if data.get(name) is not None]
+    if not provided:
+        return None, None
+    if len(provided) > 1:
+        return None, 'Provide at most one of uncertainty and relative_uncertainty'
+    
+    name = provided[0]
+    label = UNCERTAINTY_PARAMETERS[name]
+    raw = data[name]
+    if isinstance(raw, bool):
+        return None, f'{label} must be a number or an array of numbers'
+    try:
+        uncertainty = np.asarray(raw, dtype=np.float64)
+    except (TypeError, ValueError):
+        return None, f'{label} must be a number or an array of numbers'
+    except OverflowError:
+        return None, f'{label} must be finite and non-negative'
+    if uncertainty.ndim and uncertainty.shape != np.shape(values):
+        return None, f'{label} must be a number or an array matching the input'
+    if not (np.isfinite(uncertainty).all() and (uncertainty >= 0).all()):
+        return None, f'{label} must be finite and non-negative'
+    if name == 'relative_uncertainty':
+        uncertainty = uncertainty * np.abs(values)
+    return (float(uncertainty) if uncertainty.ndim == 0 else uncertainty), None
+
+
+def _scalar_uncertainty(value):
+    """Return a propagated scalar uncertainty for JSON, with divergent values as null."""
+    return value if math.isfinite(value) else None
+
+
+@api.route(f'/convert/<{_QUANTITY_CONVERTER}:source>-to-<{_QUANTITY_CONVERTER}:target>', methods=['GET', 'POST'])
+@cacheable
+def pairwise_conversion(source, target):
+    """Convert one quantity to another, e.g. /convert/energy-to-wavelength.
+
+    With an uncertainty or relative_uncertainty, the standard uncertainties
+    of the input and the result are returned as <field>_uncertainty.
+    """
+    if source == target:
+        return jsonify({'error': 'Endpoint not found'}), 404
+    try:
+        data = _request_data()
+        if data is None:
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
+        value = data.get(source)
+        
+        if value is None:
+            return jsonify({'error': f'Missing {source} parameter'}), 400
+        
+        error = _scalar_error(source, value, target)
+        if error:
+            return jsonify({'error': error}), 400
+        uncertainty, error = _read_uncertainty(data, value)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        with _timed('convert'):
+            result = {
+                QUANTITIES[source].field: value,
+                QUANTITIES[target].field: NeutronConverter.convert(source, target, value)
+            }
+            if uncertainty is not None:
+                for name in (source, target):
+                    result[QUANTITIES[name].field + '_uncertainty'] = _scalar_uncertainty(
+                        NeutronConverter.propagate_uncertainty(source, name, value, uncertainty))
+        return jsonify(result), 200
+    except HTTPException:
+        raise
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+class MicroBatcher:
+    """Coalesce concurrent scalar conversions into vectorized kernel calls.
+
+    Request threads call submit(key, value) and block. A collector thread
+    takes the first queued request, then keeps collecting for up to
+    ``window`` seconds or until ``max_size`` requests are queued. It
+    evaluates each key's values with one ``kernel(key, values)`` call
+    returning a (fields, n) array, and hands every caller its column as a
+    list. Collection stops early once every caller waiting in submit is in
+    the batch, so the window is the most latency a request can gain and is
+    only spent while more requests are still arriving.
+    """
+    
+    def __init__(self, kernel, window, max_size):
+        self.kernel = kernel
+        self.window = window
+        self.max_size = max_size
+        self.batches = 0
+        self.requests = 0
+        self.largest = 0
+        self._waiting = 0
+        self._lock = threading.Lock()
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+    
+    def submit(self, key, value):
+        """Queue one value for conversion and wait for its results."""
+        # A held lock is the cheapest one-shot signal: the collector releases it when done
+        done = threading.Lock()
+        done.acquire()
+        item = [key, value, done, None]
+        with self._lock:
+            self._waiting += 1
+        self._queue.put(item)
+        done.acquire()
+        with self._lock:
+            self._waiting -= 1
+        if isinstance(item[3], Exception):
+            raise item[3]
+        return item[3]
+    
+    def stats(self):
+        """Return the number of kernel calls and requests and the mean and largest batch sizes."""
+        return {
+            'batches': self.batches,
+            'requests': self.requests,
+            'mean_batch_size': self.requests / self.batches if self.batches else 0.0,
+            'max_batch_size': self.largest
+        }
+    
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.window
+            # Stop early once every caller blocked in submit is in the batch
+            while len(batch) < min(self.max_size, self._waiting):
+                try:
+                    batch.append(self._queue.get(timeout=max(deadline - time.perf_counter(), 0)))
+                except queue.Empty:
+                    break
+            self._evaluate(batch)
+    
+    def _evaluate(self, batch):
+        groups = {}
+        for item in batch:
+            groups.setdefault(item[0], []).append(item)
+        for key, items in groups.items():
+            try:
+                with np.errstate(divide='ignore'):
+                    rows = self.kernel(key, np.array([item[1] for item in items], dtype=np.float64)).T.tolist()
+            except Exception as e:
+                rows = [e] * len(items)
+            for item, row in zip(items, rows):
+                item[3] = row
+                item[2].release()
+        self.batches += 1
+        self.requests += len(batch)
+        self.largest = max(self.largest, len(batch))
+        request_metrics().batch_sizes.observe(len(batch))
+
+
+def _full_conversion_kernel(quantity, values):
+    """Convert an array of one quantity to every quantity, as rows in QUANTITIES order."""
+    names = list(QUANTITIES)
+    results = np.empty((len(names), values.size))
+    base_rows = [results[names.index(name)] for name in BATCH_OUTPUT_QUANTITIES]
+    NeutronConverter.convert_all(quantity, values, out=base_rows)
+    for row, name in enumerate(names):
+        if name == quantity and name not in BATCH_OUTPUT_QUANTITIES:
+            results[row] = values
+        elif name not in BATCH_OUTPUT_QUANTITIES:
+            NeutronConverter.convert(quantity, name, values, out=results[row])
+    return results
+
+
+def _scalar_convert_all(quantity, value):
+    """Return NeutronConverter.convert_all of a valid scalar, with divergent results as inf.
+
+    The plain-Python path raises on division by zero (the wavelength of a
+    neutron at rest), so such inputs are converted as a one-element array.
+    """
+    try:
+        return NeutronConverter.convert_all(quantity, value)
+    except ArithmeticError:
+        with np.errstate(divide='ignore', over='ignore'):
+            rows = NeutronConverter.convert_all(quantity, np.array([value], dtype=np.float64))
+        return tuple(float(row[0]) for row in rows)
+
+
+def _full_row(quantity, value):
+    """Convert a valid scalar to every quantity in QUANTITIES order, with divergent results as inf."""
+    try:
+        converted = dict(zip(BATCH_OUTPUT_QUANTITIES, NeutronConverter.convert_all(quantity, value)))
+        return [converted[name] if name in converted else value if name == quantity
+                else NeutronConverter.convert(quantity, name, value) for name in QUANTITIES]
+    except ArithmeticError:
+        with np.errstate(divide='ignore', over='ignore'):
+            return _full_conversion_kernel(quantity, np.array([value], dtype=np.float64))[:, 0].tolist()
+
+
+_full_batcher_lock = threading.Lock()
+
+
+def full_batcher(app):
+    """Return an app's /convert/full micro-batcher, or None when its BATCH_WINDOW is zero.
+
+    The batcher is created on first use, so that each forked worker gets its
+    own collector thread, and replaced when the batching settings change.
+    """
+    window = app.config['BATCH_WINDOW']
+    if not window:
+        return None
+    with _full_batcher_lock:
+        batcher = app.extensions.get('full_batcher')
+        if batcher is None or batcher.window != window or batcher.max_size != app.config['BATCH_MAX_SIZE']:
+            batcher = MicroBatcher(_full_conversion_kernel, window, app.config['BATCH_MAX_SIZE'])
+            app.extensions['full_batcher'] = batcher
+        return batcher
+
+
+def _full_result(data):
+    """Convert the one quantity in a request to every quantity, as for /convert/full.
+
+    Returns a tuple of (result, error), where error is the message for a 400 response.
+    """
+    if data is None:
+        return None, 'Request body must be a JSON object'
+    # Validate that exactly one parameter is provided
+    provided = [name for name in VALIDATION_RULES if data.get(name) is not None]
+    if len(provided) != 1:
+        return None, f'Provide exactly one parameter: {QUANTITY_CHOICES}'
+    
+    quantity = provided[0]
+    value = data[quantity]
+    error = _scalar_error(quantity, value)
+    if error:
+        return None, error
+    uncertainty, error = _read_uncertainty(data, value)
+    if error:
+        return None, error
+    
+    # Divergent results are null whether or not the conversion is coalesced
+    batcher = full_batcher(current_app) if uncertainty is None else None
+    with _timed('convert'):
+        row = batcher.submit(quantity, value) if batcher is not None else _full_row(quantity, value)
+        result = {spec.field: converted if math.isfinite(converted) else None
+                  for spec, converted in zip(QUANTITIES.values(), row)}
+        result[QUANTITIES[quantity].field] = value
+        if uncertainty is not None:
+            for name, spec in QUANTITIES.items():
+                result[spec.field + '_uncertainty'] = _scalar_uncertainty(
+                    NeutronConverter.propagate_uncertainty(quantity, name, value, uncertainty))
+    return result, None
+
+
+@api.route('/convert/full', methods=['GET', 'POST'])
+@cacheable
+def full_conversion():
+    """Convert any parameter to all others. Provide one of the keys of QUANTITIES.
+
+    With an uncertainty or relative_uncertainty, every field also gets its
+    propagated standard uncertainty as <field>_uncertainty. Otherwise, when
+    BATCH_WINDOW is set, the conversion is coalesced with concurrent requests
+    by the micro-batcher.
+    """
+    try:
+        result, error = _full_result(_request_data())
+        if error:
+            return jsonify({'error': error}), 400
+        return jsonify(result), 200
+    except HTTPException:
+        raise
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def _array_to_json(values):
+    """Convert an array to a JSON-ready list, mapping non-finite values to null.
+
+    Values are rounded to the significant digits requested for the response.
+    """
+    digits = _float_digits()
+    if digits:
+        values = round_significant(values, digits)
+    if np.isfinite(values).all():
+        return values.tolist()
+    return np.where(np.isfinite(values), values, None).tolist()
+
+
+def _read_npy(raw):
+    """Return a read-only array viewing the data of an .npy payload without copying it."""
+    stream = io.BytesIO(raw)
+    version = np.lib.format.read_magic(stream)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(stream)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(stream)
+    if dtype.hasobject:
+        raise ValueError('Object arrays are not supported')
+    count = math.prod(shape)
+    values = np.frombuffer(raw, dtype=dtype, count=count, offset=stream.tell())
+    return values.reshape(shape, order='F' if fortran_order else 'C')
+
+
+def _parse_batch_request():
+    """Read the quantity and input array of a batch request.
+
+    JSON bodies carry one of energy/velocity/wavelength as a list. Raw
+    little-endian float64 bodies and .npy bodies name the quantity in the
+    ``quantity`` query parameter and are viewed in place with np.frombuffer.
+    .npz bodies hold a single array named after the quantity. JSON arrays are
+    returned as lists, for validate_values to check element by element.
+    Returns a tuple of (quantity, values, error) where error is None on
+    success.
+    """
+    if request.mimetype in (RAW_MIMETYPE, NPY_MIMETYPE, NPZ_MIMETYPE):
+        raw = request.get_data(cache=False)
+        try:
+            if request.mimetype == NPZ_MIMETYPE:
+                with np.load(io.BytesIO(raw), allow_pickle=False) as archive:
+                    provided = [name for name in VALIDATION_RULES if name in archive.files]
+                    if len(provided) != 1:
+                        return None, None, f'Provide exactly one array: {QUANTITY_CHOICES}'
+                    return provided[0], archive[provided[0]], None
+            quantity = request.args.get('quantity')
+            if quantity not in VALIDATION_RULES:
+                return None, None, f'Query parameter quantity must be {QUANTITY_CHOICES}'
+            if request.mimetype == NPY_MIMETYPE:
+                return quantity, _read_npy(raw), None
+            if len(raw) % 8:
+                return None, None, 'Body length must be a multiple of 8 bytes'
+            return quantity, np.frombuffer(raw, dtype='<f8'), None
+        except ValueError as e:
+            return None, None, f'Invalid binary payload: {e}'
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return None, None, 'Request body must be a JSON object'
+    provided = [name for name in VALIDATION_RULES if data.get(name) is not None]
+    if len(provided) != 1:
+        return None, None, f'Provide exactly one parameter: {QUANTITY_CHOICES}'
+
+    quantity = provided[0]
+    if not isinstance(data[quantity], list):
+        return None, None, f'{QUANTITIES[quantity].label} must be an array of numbers'
+    return quantity, data[quantity], None
+
+
+def _negotiate_mimetype():
+    """Return the response media type the client prefers: JSON or one of the binary formats."""
+    return request.accept_mimetypes.best_match(
+        ['application/json', RAW_MIMETYPE, NPY_MIMETYPE, NPZ_MIMETYPE], default='application/json')
+
+
+def _binary_response(results, mimetype, fields=BATCH_OUTPUT_FIELDS):
+    """Pack a (len(fields), n) float64 result array into the negotiated binary format."""
+    if mimetype == NPZ_MIMETYPE:
+        buffer = io.BytesIO()
+        np.savez(buffer, **dict(zip(fields, results)))
+        body = buffer.getvalue()
+    elif mimetype == NPY_MIMETYPE:
+        buffer = io.BytesIO()
+        np.save(buffer, results)
+        body = buffer.getvalue()
+    else:
+        body = results.tobytes()
+    response = Response(body, mimetype=mimetype)
+    response.headers['X-Quantities'] = ','.join(fields)
+    response.headers['X-Count'] = str(results.shape[1])
+    response.headers['X-Dtype'] = results.dtype.str
+    return response
+
+
+@api.route('/convert/batch', methods=['POST'])
+def batch():
+    """Convert an array of energies, velocities or wavelengths to all three properties.
+
+    Output is JSON unless the Accept header asks for application/octet-stream
+    (three packed little-endian float64 columns in X-Quantities order),
+    application/x-npy (a (3, n) array) or application/x-npz (named arrays).
+    An uncertainty or relative_uncertainty (in the JSON body, or the query
+    string for binary bodies) adds the three propagated uncertainties as
+    further columns. Invalid elements reject the request with a report of
+    each one, unless the ``invalid`` parameter asks to drop them or to
+    convert them to NaN.
+    """
+    try:
+        quantity, values, error = _parse_batch_request()
+        if error:
+            return jsonify({'error': error}), 400
+        params = request.get_json() if request.is_json else request.args.to_dict()
+        policy, error = _read_invalid_policy(params)
+        if error:
+            return jsonify({'error': error}), 400
+
+        if isinstance(values, np.ndarray) and values.ndim != 1:
+            return jsonify({'error': f'{QUANTITIES[quantity].label} must be a flat array of numbers'}), 400
+        with _timed('validate'):
+            values, codes = validate_values(quantity, values)
+            values, keep, invalid = _apply_invalid_policy(values, codes, VALIDATION_MESSAGES[quantity], policy)
+        if invalid and policy == 'reject':
+            return jsonify({'error': invalid['error'][0], 'invalid': invalid}), 400
+        
+        uncertainty, error = _read_uncertainty(params, values)
+        if error:
+            return jsonify({'error': error}), 400
+        if keep is not None:
+            values = values[keep]
+            if isinstance(uncertainty, np.ndarray):
+                uncertainty = uncertainty[keep]
+        fields = BATCH_OUTPUT_FIELDS
+        if uncertainty is not None:
+            fields += tuple(field + '_uncertainty' for field in BATCH_OUTPUT_FIELDS)
+
+        _count_elements(values.size)
+        mimetype = _negotiate_mimetype()
+        results = np.empty((len(fields), values.size), dtype='<f8')
+        with _timed('convert'), np.errstate(divide='ignore'):
+            NeutronConverter.convert_all(quantity, values, out=results[:3])
+            if uncertainty is not None:
+                for target, out in zip(BATCH_OUTPUT_QUANTITIES, results[3:]):
+                    NeutronConverter.propagate_uncertainty(quantity, target, values, uncertainty, out=out)
+        if mimetype != 'application/json':
+            response = _binary_response(results, mimetype, fields)
+            if invalid:
+                response.headers['X-Invalid-Count'] = str(len(invalid['index']))
+            return response, 200
+        
+        response = {'count': int(values.size)}
+        response.update((field, _array_to_json(column)) for field, column in zip(fields, results))
+        if invalid:
+            response['invalid'] = invalid
+        return jsonify(response), 200
+    except HTTPException:
+        raise
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@functools.lru_cache(maxsize=4)
+def load_tof_converter(path):
+    """Load and cache the TofConverter for a flight-path table file."""
+    return TofConverter.from_file(path)
+
+
+def _parse_tof_request():
+    """Read the pixel ids and times of flight of a TOF request.
+
+    Accepts packed TOF_EVENT_DTYPE records (application/octet-stream), an
+    .npz archive with pixel_id and tof arrays, or JSON with pixel_id and tof
+    lists, returning the lists of JSON as they are so that each element
+    can be validated. Returns a tuple of (pixel_ids, tof_us, error).
+    """
+    try:
+        if request.mimetype == RAW_MIMETYPE:
+            raw = request.get_data(cache=False)
+            if len(raw) % TOF_EVENT_DTYPE.itemsize:
+                return None, None, f'Body length must be a multiple of {TOF_EVENT_DTYPE.itemsize} bytes'
+            events = np.frombuffer(raw, dtype=TOF_EVENT_DTYPE)
+            return events['pixel_id'], events['tof'], None
+        if request.mimetype == NPZ_MIMETYPE:
+            with np.load(io.BytesIO(request.get_data(cache=False)), allow_pickle=False) as archive:
+                if 'pixel_id' not in archive.files or 'tof' not in archive.files:
+                    return None, None, 'Archive must contain pixel_id and tof arrays'
+                return archive['pixel_id'], archive['tof'], None
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return None, None, 'Request body must be a JSON object'
+        if not isinstance(data.get('pixel_id'), list) or not isinstance(data.get('tof'), list):
+            return None, None, 'Provide pixel_id and tof arrays'
+        return data['pixel_id'], data['tof'], None
+    except (TypeError, ValueError) as e:
+        return None, None, f'Invalid event payload: {e}'
+
+
+def _is_integer(value):
+    """Return True for an int, or a float with an integral value, which excludes booleans."""
+    return type(value) is int or (type(value) is float and value.is_integer())
+
+
+def _validate_pixel_ids(pixel_ids, pixel_count):
+    """Check the pixel ids of TOF events, as validate_values does for values.
+
+    Elements that are not integers (booleans, strings and fractional numbers
+    included) are NOT_A_NUMBER, and ids outside the flight-path table are
+    OUT_OF_RANGE. Returns a tuple of (pixel_ids, codes), with the ids of
+    non-integers as -1.
+    """
+    integers = None
+    if isinstance(pixel_ids, np.ndarray):
+        if pixel_ids.dtype.kind not in 'iu':
+            integers = np.zeros(pixel_ids.shape, dtype=bool)
+            pixel_ids = np.full(pixel_ids.shape, -1, dtype=np.intp)
+    elif set(map(type, pixel_ids)) <= {int} and max(map(abs, pixel_ids), default=0) <= pixel_count:
+        pixel_ids = np.fromiter(pixel_ids, dtype=np.intp, count=len(pixel_ids))
+    else:
+        integers = np.fromiter(map(_is_integer, pixel_ids), dtype=bool, count=len(pixel_ids))
+        # Ids too large for an integer array are out of range anyway
+        pixel_ids = np.fromiter((int(value) if integer and abs(value) <= pixel_count else -1
+                                 for value, integer in zip(pixel_ids, integers)), dtype=np.intp, count=len(pixel_ids))
+    codes = np.zeros(pixel_ids.shape, dtype=np.int8)
+    codes[(pixel_ids < 0) | (pixel_ids >= pixel_count)] = OUT_OF_RANGE
+    if integers is not None:
+        codes[~integers] = NOT_A_NUMBER
+    return pixel_ids, codes
+
+
+@api.route('/convert/tof', methods=['POST'])
+def tof_conversion():
+    """Convert detector events (pixel id, time of flight in µs) to wavelength and energy.
+
+    Flight paths come from the table named by the TOF_FLIGHT_PATHS config
+    value. Output is JSON unless the Accept header asks for a binary format,
+    and events with an invalid pixel id or time of flight are handled by
+    the ``invalid`` parameter, as for /convert/batch.
+    """
+    try:
+        path = current_app.config.get('TOF_FLIGHT_PATHS')
+        if not path:
+            return jsonify({'error': 'No flight-path table configured'}), 500
+        converter = load_tof_converter(path)
+        
+        pixel_ids, tof, error = _parse_tof_request()
+        if error:
+            return jsonify({'error': error}), 400
+        policy, error = _read_invalid_policy(request.get_json() if request.is_json else request.args.to_dict())
+        if error:
+            return jsonify({'error': error}), 400
+        
+        # Times of flight follow the rules of TOF per metre: finite and positive
+        with _timed('validate'):
+            pixel_ids, pixel_codes = _validate_pixel_ids(pixel_ids, converter.pixel_count)
+            tof, tof_codes = validate_values('tof_per_metre', tof)
+        if pixel_ids.shape != tof.shape or tof.ndim != 1:
+            return jsonify({'error': 'pixel_id and tof must be flat arrays of equal length'}), 400
+        # An event is invalid when either field is; pixel id codes are numbered after the TOF codes
+        pixel_messages = (None, 'pixel_id must be an integer', None,
+                          f'pixel_id must be between 0 and {converter.pixel_count - 1}', None)
+        codes = np.where(pixel_codes, pixel_codes + len(TOF_VALIDATION_MESSAGES), tof_codes)
+        tof, keep, invalid = _apply_invalid_policy(tof, codes, TOF_VALIDATION_MESSAGES + pixel_messages, policy)
+        if invalid and policy == 'reject':
+            return jsonify({'error': invalid['error'][0], 'invalid': invalid}), 400
+        if invalid:
+            # Events converted to NaN still need an index into the flight-path table
+            pixel_ids = np.where(pixel_codes, 0, pixel_ids)
+        if keep is not None:
+            pixel_ids, tof = pixel_ids[keep], tof[keep]
+        
+        _count_elements(tof.size)
+        results = np.empty((2, tof.size), dtype='<f8')
+        with _timed('convert'):
+            converter.wavelength(pixel_ids, tof, out=results[0])
+            converter.energy(pixel_ids, tof, out=results[1])
+        
+        mimetype = _negotiate_mimetype()
+        if mimetype != 'application/json':
+            response = _binary_response(results, mimetype, TOF_OUTPUT_FIELDS)
+            if invalid:
+                response.headers['X-Invalid-Count'] = str(len(invalid['index']))
+            return response, 200
+        response = {
+            'count': int(tof.size),
+            'wavelength_angstrom': _array_to_json(results[0]),
+            'energy_meV': _array_to_json(results[1])
+        }
+        if invalid:
+            response['invalid'] = invalid
+        return jsonify(response), 200
+    except HTTPException:
+        raise
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@functools.lru_cache(maxsize=TABLE_CACHE_SIZE)
+def conversion_table(quantity, start, stop, count, spacing):
+    """Return a read-only (3, count) table of energy, velocity and wavelength.
+
+    The grid of ``quantity`` runs from start to stop in linear or log
+    spacing and is converted in one vectorized pass. Tables are kept in a
+    bounded LRU cache, so repeated requests for popular grids are free.
+    """
+    grid = np.geomspace(start, stop, count) if spacing == 'log' else np.linspace(start, stop, count)
+    table = np.empty((3, count), dtype='<f8')
+    with np.errstate(divide='ignore'):
+        NeutronConverter.convert_all(quantity, grid, out=table)
+    table.flags.writeable = False
+    return table
+
+
+def _parse_table_request():
+    """Read and validate the grid parameters of a table request.
+
+    Returns a tuple of (quantity, start, stop, count, spacing, error).
+    """
+    args = request.args
+    quantity = args.get('quantity')
+    spacing = args.get('spacing', 'linear')
+    if quantity not in VALIDATION_RULES:
+        return None, None, None, None, None, f'Parameter quantity must be {QUANTITY_CHOICES}'
+    if spacing not in TABLE_SPACINGS:
+        return None, None, None, None, None, 'Parameter spacing must be linear or log'
+    try:
+        start = float(args['start'])
+        stop = float(args['stop'])
+        count = int(args['count'])
+    except (KeyError, ValueError):
+        return None, None, None, None, None, 'Provide numeric start and stop and an integer count'
+    if not (math.isfinite(start) and math.isfinite(stop)):
+        return None, None, None, None, None, 'Parameters start and stop must be finite'
+    if not 1 <= count <= TABLE_MAX_COUNT:
+        return None, None, None, None, None, f'Parameter count must be between 1 and {TABLE_MAX_COUNT}'
+    error = _scalar_error(quantity, min(start, stop))
+    if error:
+        return None, None, None, None, None, error
+    if spacing == 'log' and min(start, stop) <= 0:
+        return None, None, None, None, None, 'Log spacing requires positive start and stop'
+    return quantity, start, stop, count, spacing, None
+
+
+@api.route('/convert/table', methods=['GET'])
+def table():
+    """Serve an energy-velocity-wavelength table over a linear or log grid.
+
+    Query parameters: quantity, start, stop, count and spacing (linear or
+    log). JSON responses are paged with offset and limit; the whole table
+    can instead be streamed as NDJSON or fetched in a binary format through
+    the Accept header.
+    """
+    try:
+        quantity, start, stop, count, spacing, error = _parse_table_request()
+        if error:
+            return jsonify({'error': error}), 400
+        _count_elements(count)
+        with _timed('convert'):
+            results = conversion_table(quantity, start, stop, count, spacing)
+        
+        mimetype = request.accept_mimetypes.best_match(
+            ['application/json', 'application/x-ndjson', RAW_MIMETYPE, NPY_MIMETYPE, NPZ_MIMETYPE],
+            default='application/json')
+        if mimetype == 'application/x-ndjson':
+            def generate():
+                for begin in range(0, count, STREAM_FLUSH_LINES):
+                    rows = _array_to_json(results[:, begin:begin + STREAM_FLUSH_LINES].T)
+                    yield ''.join(current_app.json.dumps(dict(zip(BATCH_OUTPUT_FIELDS, row))) + '\n' for row in rows)
+            response = Response(stream_with_context(generate()), mimetype=mimetype)
+        elif mimetype != 'application/json':
+            response = _binary_response(results, mimetype)
+        else:
+            try:
+                offset = int(request.args.get('offset', 0))
+                limit = int(request.args.get('limit', TABLE_PAGE_SIZE))
+            except ValueError:
+                return jsonify({'error': 'Parameters offset and limit must be integers'}), 400
+            if offset < 0 or limit < 1:
+                return jsonify({'error': 'Parameter offset must be non-negative and limit positive'}), 400
+            page = results[:, offset:offset + limit]
+            response = jsonify({
+                'quantity': quantity,
+                'spacing': spacing,
+                'count': count,
+                'offset': offset,
+                'limit': limit,
+                'next_offset': offset + limit if offset + limit < count else None,
+                **{field: _array_to_json(column) for field, column in zip(BATCH_OUTPUT_FIELDS, page)}
+            })
+            response.add_etag()
+            response.make_conditional(request)
+        response.cache_control.public = True
+        response.cache_control.max_age = CONVERSION_CACHE_MAX_AGE
+        response.vary.add('Accept')
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def _body_lines():
+    """Return an iterator over the lines of the request body, reading the first line now.
+
+    A body that cannot be read at all, such as one with a corrupt gzip
+    header, is then rejected with 400 before a streamed response starts.
+    Later read errors are raised by the iterator as BadRequest.
+    """
+    lines = iter(request.stream)
+    first = next(lines, None)
+    return lines if first is None else itertools.chain([first], lines)
+
+
+def _convert_record(line):
+    """Convert one NDJSON input line to an output record."""
+    try:
+        data = json.loads(line)
+    except ValueError:
+        return {'error': 'Invalid JSON'}
+    if not isinstance(data, dict):
+        return {'error': 'Each line must be a JSON object'}
+    
+    provided = [name for name in VALIDATION_RULES if data.get(name) is not None]
+    if len(provided) != 1:
+        return {'error': f'Provide exactly one parameter: {QUANTITY_CHOICES}'}
+    
+    quantity = provided[0]
+    value = data[quantity]
+    error = _scalar_error(quantity, value)
+    if error:
+        return {'error': error}
+    
+    converted = _scalar_convert_all(quantity, value)
+    return {field: result if math.isfinite(result) else None for field, result in zip(BATCH_OUTPUT_FIELDS, converted)}
+
+
+@api.route('/convert/stream', methods=['POST'])
+def stream():
+    """Convert newline-delimited JSON records as they arrive.
+
+    Each input line holds one of energy, velocity or wavelength and produces
+    one output line with all three properties, or with an error and the
+    1-based line number. The body is read incrementally and converted records
+    are flushed every STREAM_FLUSH_LINES lines, so memory use does not grow
+    with the input size and results start before the upload has finished.
+    """
+    body = _body_lines()
+    
+    def generate():
+        chunk = []
+        number = 0
+        try:
+            for number, line in enumerate(body, start=1):
+                if not line.strip():
+                    continue
+                record = _convert_record(line)
+                if 'error' in record:
+                    record['line'] = number
+                chunk.append(current_app.json.dumps(record))
+                if len(chunk) >= STREAM_FLUSH_LINES:
+                    yield '\n'.join(chunk) + '\n'
+                    chunk = []
+        except (BadRequest, RequestEntityTooLarge) as e:
+            chunk.append(current_app.json.dumps({'error': e.description, 'line': number + 1}))
+        if chunk:
+            yield '\n'.join(chunk) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+def _live_record(message):
+    """Convert one live channel message to its reply, echoing the message's id if it has one."""
+    try:
+        data = json.loads(message)
+    except ValueError:
+        return {'error': 'Invalid JSON'}
+    if not isinstance(data, dict):
+        return {'error': 'Each message must be a JSON object'}
+    
+    try:
+        result, error = _full_result(data)
+        record = {'error': error} if error else result
+    except Exception as e:
+        record = {'error': str(e)}
+    if 'id' in data:
+        record['id'] = data['id']
+    return record
+
+
+class _WebSocketClosedResponse(Response):
+    """Response for a finished WebSocket, telling the server not to write to the connection."""
+    
+    def __call__(self, environ, start_response):
+        # The socket was taken over by the WebSocket; each server has its own way to drop it
+        if 'gunicorn.socket' in environ:
+            raise StopIteration()
+        if 'werkzeug.socket' in environ:
+            raise ConnectionError()
+        return []
+
+
+@api.route('/convert/live', methods=['POST'])
+def live():
+    """Convert a stream of values over one persistent connection.
+
+    The NDJSON request body, which may be streamed, is answered as
+    text/event-stream with one event per input line, sent as soon as the
+    line is converted. Each line is a JSON object like a /convert/full
+    request body, optionally with an id; its event holds every quantity (or
+    an error) and the same id.
+    """
+    body = _body_lines()
+    
+    def generate():
+        try:
+            for line in body:
+                if line.strip():
+                    yield f'data: {current_app.json.dumps(_live_record(line))}\n\n'
+        except (BadRequest, RequestEntityTooLarge) as e:
+            yield f"data: {current_app.json.dumps({'error': e.description})}\n\n"
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.cache_control.no_cache = True
+    # Stop nginx from buffering the events
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+_live_sockets_lock = threading.Lock()
+_live_sockets = 0
+
+
+@contextlib.contextmanager
+def _live_socket_slot(limit):
+    """Hold one of this process's ``limit`` WebSocket slots, yielding False when none is free."""
+    global _live_sockets
+    with _live_sockets_lock:
+        acquired = _live_sockets < limit
+        _live_sockets += acquired
+    try:
+        yield acquired
+    finally:
+        with _live_sockets_lock:
+            _live_sockets -= acquired
+
+
+@api.route('/convert/live', websocket=True)
+def live_socket():
+    """Convert messages on a WebSocket, as /convert/live does for lines.
+
+    Every text message is answered by one message. This needs the optional
+    simple-websocket package. An open socket holds a server thread, so each
+    process accepts at most LIVE_MAX_SOCKETS of them and answers further
+    ones with 503; sockets idle for LIVE_IDLE_TIMEOUT seconds are closed.
+    """
+    try:
+        import simple_websocket
+    except ImportError:  # simple-websocket is optional; /convert/live then offers only the event stream
+        return jsonify({'error': 'WebSocket support requires the simple-websocket package'}), 501
+    with _live_socket_slot(current_app.config['LIVE_MAX_SOCKETS']) as acquired:
+        if not acquired:
+            response = jsonify({'error': 'Too many live connections; use POST /convert/live or /convert/full'})
+            response.headers['Retry-After'] = str(LIVE_IDLE_TIMEOUT)
+            return response, 503
+        ws = simple_websocket.Server.accept(request.environ, max_message_size=LIVE_MAX_MESSAGE_BYTES)
+        try:
+            while True:
+                message = ws.receive(timeout=LIVE_IDLE_TIMEOUT)
+                if message is None:
+                    ws.close(message='Idle timeout')
+                    break
+                ws.send(current_app.json.dumps(_live_record(message)))
+        except simple_websocket.ConnectionClosed:
+            pass
+    return _WebSocketClosedResponse()
+
+
+@api.app_errorhandler(400)
+def bad_request(error):
+    """Handle 400 errors, such as request bodies that cannot be decoded."""
+    return jsonify({'error': error.description}), 400
+
+
+@api.app_errorhandler(413)
+def request_entity_too_large(error):
+    """Handle 413 errors, such as request bodies that decompress to more than MAX_DECODED_BYTES."""
+    return jsonify({'error': error.description}), 413
+
+
+@api.app_errorhandler(404)
+def not_found(error):
+    """Handle 404 errors."""
+    return jsonify({'error': 'Endpoint not found'}), 404
+
+
+@api.app_errorhandler(405)
+def method_not_allowed(error):
+    """Handle 405 errors."""
+    return jsonify({'error': 'Method not allowed'}), 405
+
+
+def create_app(config=None):
+    """Create the Flask application.
+
+    Settings are read from the NEUTRON_* environment variables and then
+    overridden by the ``config`` mapping, e.g.
+    create_app({'JSON_FLOAT_DIGITS': 6}).
+    """
+    app = Flask(__name__)
+    app.config.update(config_from_env())
+    app.config.update(config or {})
+    app.request_class = InstrumentedRequest
+    app.json = FastJSONProvider(app)
+    app.wsgi_app = ProfilingMiddleware(RequestDecodingMiddleware(app.wsgi_app, app.config), app.config)
+    app.register_blueprint(api)
+    return app